@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# benchmark of PowerPoint deck generation
+#
+#   per-slide : open saved deck, add one slide, save deck (previous OnPPT)
+#   batch     : add all slides to one presentation, save once (current OnPPT)
+#
+# usage
+#   python benchmark/bench_ppt.py [--counts 10 50 100 200] [--template template.pptx]
+import argparse
+import io
+import os
+import tempfile
+import time
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from pptx import Presentation
+from pptx.util import Inches
+
+
+# -----------------------------------------------------------------------------
+#  make_image - PNG image of the same size as SPC chart
+# -----------------------------------------------------------------------------
+def make_image() -> bytes:
+    fig = Figure(dpi=100, figsize=(10, 3.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.plot(range(100), [i % 7 for i in range(100)], linewidth=1, color='gray')
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+
+    return buf.getvalue()
+
+
+# -----------------------------------------------------------------------------
+#  add_slide - slide with title and chart image, as PowerPoint.add_slide
+# -----------------------------------------------------------------------------
+def add_slide(ppt, image: bytes, i: int):
+    slide = ppt.slides.add_slide(ppt.slide_layouts[5])
+    slide.shapes.title.text = 'PARAMETER %d' % i
+    slide.shapes.add_picture(io.BytesIO(image), left=Inches(0), top=Inches(1.92), height=Inches(3.5))
+
+
+def run_per_slide(template, image: bytes, n: int, save_path: str):
+    path = template
+    for i in range(n):
+        ppt = Presentation(path)
+        add_slide(ppt, image, i)
+        ppt.save(save_path)
+        path = save_path
+
+
+def run_batch(template, image: bytes, n: int, save_path: str):
+    ppt = Presentation(template)
+    for i in range(n):
+        add_slide(ppt, image, i)
+    ppt.save(save_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of PowerPoint deck generation')
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 50, 100, 200],
+                        help='number of slides (parameters)')
+    parser.add_argument('--template', default=None, help='PowerPoint template (default: python-pptx default)')
+    args = parser.parse_args()
+
+    image = make_image()
+    save_path = os.path.join(tempfile.mkdtemp(), 'bench.pptx')
+
+    print('%8s %12s %12s %8s' % ('slides', 'per-slide[s]', 'batch[s]', 'ratio'))
+    for n in args.counts:
+        t0 = time.perf_counter()
+        run_per_slide(args.template, image, n, save_path)
+        t1 = time.perf_counter()
+        run_batch(args.template, image, n, save_path)
+        t2 = time.perf_counter()
+        print('%8d %12.3f %12.3f %8.1f' % (n, t1 - t0, t2 - t1, (t1 - t0) / (t2 - t1)))
+
+
+if __name__ == '__main__':
+    main()
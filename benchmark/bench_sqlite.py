@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# benchmark of SQLite statements issued through SqlDB
+#
+#   per-statement : connect, execute, commit and close for every statement
+#                   (previous SqlDB.put/get)
+#   pooled        : connection of the thread is reused (current SqlDB)
+#   transaction   : pooled, all statements in one SqlDB.transaction()
+#
+#   all modes run on the same schema and indexes (schema.py), only run()
+#   is timed
+#
+# usage
+#   python benchmark/bench_sqlite.py [--counts 1000 5000]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import schema
+from database import SqlDB
+
+
+class PerStatementDB():
+    def __init__(self, dbname):
+        self.dbname = dbname
+
+    def put(self, sql):
+        con = sqlite3.connect(self.dbname)
+        cur = con.cursor()
+        cur.execute(sql)
+        con.commit()
+        con.close()
+
+    def get(self, sql):
+        con = sqlite3.connect(self.dbname)
+        cur = con.cursor()
+        cur.execute(sql)
+        out = cur.fetchall()
+        con.close()
+        return out
+
+
+def create_db(dbname: str):
+    con = sqlite3.connect(dbname, isolation_level=None)
+    schema.migrate(con)
+    con.close()
+
+
+# -----------------------------------------------------------------------------
+#  run - select then insert as DBManWin.updateDB does for each measurement
+# -----------------------------------------------------------------------------
+def run(db, n: int):
+    for i in range(n):
+        db.get('SELECT id_measure FROM measure WHERE id_param = %d AND id_batch = %d;' % (i % 50, i))
+        db.put('INSERT INTO measure VALUES(NULL, %d, %d, %f);' % (i % 50, i, i * 0.1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of SQLite statements issued through SqlDB')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 5000],
+                        help='number of select/insert pairs')
+    args = parser.parse_args()
+
+    dirname = tempfile.mkdtemp()
+
+    print('%8s %16s %16s %16s' % ('stmts', 'per-statement/s', 'pooled/s', 'transaction/s'))
+    for n in args.counts:
+        result = []
+        for mode in ['per-statement', 'pooled', 'transaction']:
+            dbname = os.path.join(dirname, '%s-%d.sqlite3' % (mode, n))
+            create_db(dbname)
+
+            if mode == 'per-statement':
+                t0 = time.perf_counter()
+                run(PerStatementDB(dbname), n)
+                t1 = time.perf_counter()
+            else:
+                # schema is created already, connection is opened before timing
+                db = SqlDB(dbname, migrate=False)
+                db.connect()
+                t0 = time.perf_counter()
+                if mode == 'pooled':
+                    run(db, n)
+                else:
+                    with db.transaction():
+                        run(db, n)
+                t1 = time.perf_counter()
+                db.close()
+            result.append(2 * n / (t1 - t0))
+
+        print('%8d %16.0f %16.0f %16.0f' % (2 * n, *result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# benchmark of SPC chart rendering, time and number of figure draws per chart
+#
+#   legacy  : tick labels are read after fig.canvas.draw() for each y axis
+#             (previous Trend.add_extra_tick_values)
+#   current : tick labels are formatted by the formatter of the axis
+#
+#   draws are counted for Trend.get only and for Trend.get + savefig,
+#   savefig is the one draw needed for display or PowerPoint slide
+#
+# usage
+#   python benchmark/bench_trend.py [--charts 50] [--points 200] [--format png]
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from office import ExcelSPC
+from trend import Trend
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# SyntheticSource
+#
+# description
+#   data source of Trend (see datasource.py) with random data,
+#   Two-Sided and One-Sided parameters alternately
+class SyntheticSource():
+    def __init__(self, charts: int, points: int):
+        rng = np.random.default_rng(0)
+        self.rows: list = []
+        self.series: dict = {}
+        self.metrics: dict = {}
+        for row in range(charts):
+            name_part = 'PART%02d' % (row // 10)
+            name_param = 'PARAM%03d' % row
+            values = 10 + rng.normal(0, 1, points)
+            df = pd.DataFrame({
+                'Sample': np.arange(1, points + 1),
+                'Date': pd.date_range('2020-01-01', periods=points, freq='D'),
+                'Data Type': ['Historic'] * (points - points // 4) + ['Recent'] * (points // 4),
+                name_param: values,
+            })
+            metrics = {key: np.nan for key in ExcelSPC.keys_metrics}
+            metrics.update({
+                'Part Number': name_part, 'Parameter Name': name_param,
+                'Spec Type': 'Two-Sided' if row % 2 == 0 else 'One-Sided',
+                'LSL': 6.0, 'Target': 10.0, 'USL': 14.0,
+                'LCL': 7.0, 'Avg': 10.0, 'UCL': 13.0,
+                'RLCL': 7.5, 'RUCL': 12.5,
+            })
+            self.rows.append((name_part, name_param))
+            self.series[(name_part, name_param)] = df
+            self.metrics[(name_part, name_param)] = metrics
+
+    def get_part_param(self, row: int):
+        return self.rows[row]
+
+    def get_SL_flag(self, row: int) -> bool:
+        return False
+
+    def get_metrics(self, name_part: str, name_param: str) -> dict:
+        return dict(self.metrics[(name_part, name_param)])
+
+    def get_series(self, name_part: str, name_param: str) -> pd.DataFrame:
+        return self.series[(name_part, name_param)]
+
+
+class TrendLegacy(Trend):
+    def add_extra_tick_values(self, ax, list_labels, metrics):
+        super().add_extra_tick_values(ax, list_labels, metrics)
+        # update drawing to reflect new ticks, as before
+        ax.figure.canvas.draw()
+
+
+# -----------------------------------------------------------------------------
+#  DrawCounter - count calls of Figure.draw
+# -----------------------------------------------------------------------------
+class DrawCounter():
+    def __init__(self):
+        self.count: int = 0
+        self.draw_original = Figure.draw
+
+    def __enter__(self):
+        counter = self
+
+        def draw(fig, renderer):
+            counter.count += 1
+            return counter.draw_original(fig, renderer)
+
+        Figure.draw = draw
+        return self
+
+    def __exit__(self, *args):
+        Figure.draw = self.draw_original
+
+
+def run(cls, source: SyntheticSource, format: str):
+    n = len(source.rows)
+    with DrawCounter() as counter:
+        t0 = time.perf_counter()
+        figures = []
+        for row in range(n):
+            name_part, name_param = source.get_part_param(row)
+            figures.append(cls(source, row).get({'PART': name_part, 'PARAM': name_param}))
+        t1 = time.perf_counter()
+        draws_get = counter.count
+        for fig in figures:
+            fig.savefig(io.BytesIO(), format=format)
+        t2 = time.perf_counter()
+
+    return (t1 - t0) / n, (t2 - t0) / n, draws_get / n, counter.count / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of SPC chart rendering')
+    parser.add_argument('--charts', type=int, default=50, help='number of charts')
+    parser.add_argument('--points', type=int, default=200, help='number of data points per chart')
+    parser.add_argument('--format', default='png', help='image format of savefig')
+    args = parser.parse_args()
+
+    source = SyntheticSource(args.charts, args.points)
+
+    print('%8s %12s %14s %12s %14s' % ('', 'get[ms]', 'get+save[ms]', 'draws(get)', 'draws(total)'))
+    for name, cls in (('legacy', TrendLegacy), ('current', Trend)):
+        t_get, t_total, draws_get, draws_total = run(cls, source, args.format)
+        print('%8s %12.1f %14.1f %12.1f %14.1f' % (name, t_get * 1e3, t_total * 1e3, draws_get, draws_total))
+
+
+if __name__ == '__main__':
+    main()
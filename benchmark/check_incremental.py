@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# check of incremental import of BulkImporter, rows appended to part tab
+# after last import must be imported
+#
+#   row with same Date and Sample as last imported row but new serial,
+#   and row with later Date, are appended to records of one part tab,
+#   then imported incrementally into temporary database
+#
+# usage
+#   python benchmark/check_incremental.py [--rows 40]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import SqlDB
+from db_import import BulkImporter, PartRows
+
+num_part_excel: str = '1234-000-01 Widget'
+list_param: list = ['param0', 'param1']
+
+
+def make_rows(n: int, extra: list) -> PartRows:
+    rows = PartRows(num_part_excel)
+    for name_param in list_param:
+        rows.params.append((name_param, {
+            'num_key': 'K', 'lsl': 9.0, 'target': 10.0, 'usl': 11.0, 'charttype': 'LJ',
+            'metrology': 'CMM', 'multiple': 'Single', 'spectype': 'Two-Sided', 'frozen': 'Yes',
+            'lcl': 9.5, 'mean': 10.0, 'ucl': 10.5,
+        }))
+
+    # (sample, day, serial)
+    records = [(i + 1, i, 'S%d' % i) for i in range(n)] + extra
+    rows.sample = [sample for sample, day, serial in records]
+    rows.timestamp = [1577836800 + day * 86400 for sample, day, serial in records]
+    rows.id_lot = [''] * len(records)
+    rows.serial = [serial for sample, day, serial in records]
+    for name_param in list_param:
+        rows.values[name_param] = [10.0 + 0.01 * i for i in range(len(records))]
+    # content of tab is changed by appended rows
+    rows.hash = 'hash%d' % len(records)
+
+    return rows
+
+
+def count(dbname: str, table: str) -> int:
+    con = sqlite3.connect(dbname)
+    n = con.execute('SELECT count(*) FROM %s;' % table).fetchone()[0]
+    con.close()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='check of incremental import')
+    parser.add_argument('--rows', type=int, default=40, help='number of rows imported first')
+    args = parser.parse_args()
+    n = args.rows
+
+    dbname = os.path.join(tempfile.mkdtemp(), 'check.sqlite3')
+    db = SqlDB(dbname)
+    db.put('INSERT INTO supplier VALUES(NULL, ?, ?);', ('Big Co', 'Big'))
+    db.put('INSERT INTO part VALUES(NULL, 1, ?);', ('1234-000-01',))
+
+    cases = [
+        ('first import', [], n),
+        ('same Date and Sample, new serial', [(n, n - 1, 'S%d-2' % (n - 1))], n + 1),
+        ('later Date', [(n, n - 1, 'S%d-2' % (n - 1)), (n + 1, n, 'S%d' % n)], n + 2),
+        ('unchanged', [(n, n - 1, 'S%d-2' % (n - 1)), (n + 1, n, 'S%d' % n)], n + 2),
+    ]
+
+    n_error = 0
+    for name, extra, n_batch in cases:
+        importer = BulkImporter(db)
+        importer.load(1, [make_rows(n, extra)])
+        result = (count(dbname, 'batch'), count(dbname, 'measure'))
+        expected = (n_batch, n_batch * len(list_param))
+        status = 'ok' if result == expected and len(importer.errors) == 0 else 'NG'
+        if status != 'ok':
+            n_error += 1
+        print('%-36s batch %4d measure %4d (expected %d, %d) %s' % (name, *result, *expected, status))
+
+    db.close()
+    return 0 if n_error == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# check of Trend.update, chart redrawn in place must be identical to chart
+# rendered in new figure
+#
+#   charts are switched row by row on one Trend instance, after zoom as
+#   done by toolbar, with Spec Limit flag off and on, each image is
+#   compared with image of fresh Trend instance
+#
+# usage
+#   python benchmark/check_redraw.py [--charts 40] [--points 200] [--format png]
+import argparse
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_trend import SyntheticSource
+from trend import Trend
+
+
+class FlaggedSource(SyntheticSource):
+    def __init__(self, charts: int, points: int):
+        super().__init__(charts, points)
+        self.flag_SL: bool = False
+
+    def get_SL_flag(self, row: int) -> bool:
+        return self.flag_SL
+
+
+def save(fig, format: str) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format=format)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='check of SPC chart redrawn in place')
+    parser.add_argument('--charts', type=int, default=40, help='number of charts')
+    parser.add_argument('--points', type=int, default=200, help='number of data points per chart')
+    parser.add_argument('--format', default='png', help='image format of savefig')
+    args = parser.parse_args()
+
+    source = FlaggedSource(args.charts, args.points)
+
+    n_total = n_inplace = n_mismatch = 0
+    for flag in (False, True):
+        source.flag_SL = flag
+        # every other row, so that layout changes between charts too
+        for start in (0, 1):
+            trend = None
+            for row in range(start, args.charts, 2):
+                name_part, name_param = source.get_part_param(row)
+                info = {'PART': name_part, 'PARAM': name_param}
+                if trend is None:
+                    trend = Trend(source, row)
+                    fig = trend.get(info)
+                else:
+                    # zoom as toolbar does, reset by update
+                    trend.ax1.set_xlim(2, 5)
+                    trend.ax1.set_ylim(0, 1)
+                    ax1 = trend.ax1
+                    fig = trend.update(info, row)
+                    n_inplace += trend.ax1 is ax1
+
+                n_total += 1
+                if save(fig, args.format) != save(Trend(source, row).get(info), args.format):
+                    n_mismatch += 1
+                    print('mismatch: row %d, Spec Limit %s' % (row, flag))
+
+    print('%d chart(s), %d redrawn in place, %d mismatch(es)' % (n_total, n_inplace, n_mismatch))
+    return 0 if n_mismatch == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
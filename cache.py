@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# coding: utf-8
+import argparse
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+
+# =============================================================================
+#  SheetCache - on-disk columnar cache of parsed Excel sheets
+#
+#  layout
+#    <dirname>/<key>/meta.pkl    : source file and list of sheet names
+#    <dirname>/<key>/<n>/        : n-th sheet
+#        frame.pkl               : column labels, index and dtypes
+#        <m>.npy                 : m-th column, memory-mapped on load
+#                                  unless it holds Python objects
+#
+#  key is a hash of path, size and modification time of Excel file,
+#  so that any change of the file makes a new entry, content is hashed as
+#  well only if file has been modified within mtime_resolution
+# =============================================================================
+class SheetCache():
+    # default cache directory and size limit (bytes)
+    dirname: str = os.path.expanduser('~/.cache/spc_master')
+    max_size: int = 2 * 1024 ** 3
+
+    name_meta: str = 'meta.pkl'
+    name_frame: str = 'frame.pkl'
+
+    # seconds, change of file within this period after modification may not
+    # alter mtime on some file systems (e.g. FAT)
+    mtime_resolution: float = 2.0
+
+    def __init__(self, dirname: str = None, max_size: int = None):
+        if dirname:
+            self.dirname = dirname
+        if max_size is not None:
+            self.max_size = max_size
+
+    # -------------------------------------------------------------------------
+    #  get_key
+    #  get cache key of specified Excel file
+    #
+    #  argument
+    #    filename : Excel file
+    #
+    #  return
+    #    str - hex digest of path, size and mtime of file
+    #          (and content if file has been modified just now)
+    # -------------------------------------------------------------------------
+    def get_key(self, filename: str) -> str:
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+
+        key = hashlib.sha1()
+        key.update(path.encode('utf-8'))
+        key.update(str(stat.st_size).encode('utf-8'))
+        key.update(str(stat.st_mtime_ns).encode('utf-8'))
+
+        if time.time() - stat.st_mtime < self.mtime_resolution:
+            # file may be changed again without changing mtime
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    key.update(chunk)
+
+        return key.hexdigest()
+
+    # -------------------------------------------------------------------------
+    #  get_sheet_names
+    #
+    #  argument
+    #    key : cache key
+    #
+    #  return
+    #    list of sheet names, None if not cached
+    # -------------------------------------------------------------------------
+    def get_sheet_names(self, key: str):
+        path = os.path.join(self.dirname, key, self.name_meta)
+        try:
+            with open(path, 'rb') as f:
+                meta = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        # mark as recently used for eviction
+        os.utime(path)
+
+        return meta['sheets']
+
+    # -------------------------------------------------------------------------
+    #  put_sheet_names
+    #
+    #  argument
+    #    key      : cache key
+    #    filename : Excel file
+    #    names    : list of sheet names
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def put_sheet_names(self, key: str, filename: str, names: list):
+        meta = {
+            'filename': os.path.abspath(filename),
+            'sheets': list(names),
+        }
+        os.makedirs(os.path.join(self.dirname, key), exist_ok=True)
+        self.write_atomic(os.path.join(self.dirname, key, self.name_meta), pickle.dumps(meta))
+
+    # -------------------------------------------------------------------------
+    #  has_sheet
+    #
+    #  argument
+    #    key   : cache key
+    #    index : position of sheet in workbook
+    #
+    #  return
+    #    True if sheet is cached
+    # -------------------------------------------------------------------------
+    def has_sheet(self, key: str, index: int) -> bool:
+        path = os.path.join(self.dirname, key, str(index), self.name_frame)
+        return os.path.exists(path)
+
+    # -------------------------------------------------------------------------
+    #  get_sheet
+    #  load sheet from cache
+    #
+    #  argument
+    #    key   : cache key
+    #    index : position of sheet in workbook
+    #
+    #  return
+    #    pandas dataframe
+    # -------------------------------------------------------------------------
+    def get_sheet(self, key: str, index: int) -> pd.DataFrame:
+        dir_sheet = os.path.join(self.dirname, key, str(index))
+        with open(os.path.join(dir_sheet, self.name_frame), 'rb') as f:
+            frame = pickle.load(f)
+
+        columns = {}
+        for i, dtype in enumerate(frame['dtypes']):
+            path = os.path.join(dir_sheet, '%d.npy' % i)
+            if frame['objects'][i]:
+                array = np.load(path, allow_pickle=True)
+            else:
+                array = np.load(path, mmap_mode='r')
+            series = pd.Series(array, copy=False)
+            if str(series.dtype) != dtype:
+                # pandas extension dtype, e.g. string
+                series = series.astype(dtype)
+            columns[i] = series
+
+        df = pd.DataFrame(columns, copy=False)
+        df.columns = frame['columns']
+        df.index = frame['index']
+
+        return df
+
+    # -------------------------------------------------------------------------
+    #  put_sheet
+    #  store sheet to cache, one file per column
+    #
+    #  argument
+    #    key   : cache key
+    #    index : position of sheet in workbook
+    #    df    : pandas dataframe
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def put_sheet(self, key: str, index: int, df: pd.DataFrame):
+        dir_key = os.path.join(self.dirname, key)
+        dir_sheet = os.path.join(dir_key, str(index))
+        if os.path.exists(dir_sheet):
+            return
+
+        # write to temporary directory first, then rename it
+        dir_tmp = os.path.join(dir_key, '%d.tmp%d' % (index, os.getpid()))
+        os.makedirs(dir_tmp, exist_ok=True)
+
+        dtypes = []
+        objects = []
+        for i in range(len(df.columns)):
+            series: pd.Series = df.iloc[:, i]
+            array = series.to_numpy()
+            dtypes.append(str(series.dtype))
+            objects.append(array.dtype.hasobject)
+            np.save(os.path.join(dir_tmp, '%d.npy' % i), array, allow_pickle=array.dtype.hasobject)
+
+        frame = {
+            'columns': list(df.columns),
+            'index': df.index,
+            'dtypes': dtypes,
+            'objects': objects,
+        }
+        with open(os.path.join(dir_tmp, self.name_frame), 'wb') as f:
+            pickle.dump(frame, f)
+
+        try:
+            os.replace(dir_tmp, dir_sheet)
+        except OSError:
+            # stored by other process in the meantime
+            shutil.rmtree(dir_tmp, ignore_errors=True)
+
+    # -------------------------------------------------------------------------
+    #  write_atomic
+    #
+    #  argument
+    #    path : file to write
+    #    data : bytes
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def write_atomic(self, path: str, data: bytes):
+        path_tmp = '%s.tmp%d' % (path, os.getpid())
+        with open(path_tmp, 'wb') as f:
+            f.write(data)
+        os.replace(path_tmp, path)
+
+    # -------------------------------------------------------------------------
+    #  get_entries
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    list of (key, size in bytes, last used time, source filename),
+    #    least recently used first
+    # -------------------------------------------------------------------------
+    def get_entries(self) -> list:
+        if not os.path.isdir(self.dirname):
+            return []
+
+        list_entry = []
+        for key in os.listdir(self.dirname):
+            dir_key = os.path.join(self.dirname, key)
+            if not os.path.isdir(dir_key):
+                continue
+
+            size = 0
+            for root, dirs, files in os.walk(dir_key):
+                for name in files:
+                    try:
+                        size += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+            path_meta = os.path.join(dir_key, self.name_meta)
+            try:
+                used = os.path.getmtime(path_meta)
+                with open(path_meta, 'rb') as f:
+                    filename = pickle.load(f)['filename']
+            except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+                used = 0
+                filename = ''
+
+            list_entry.append((key, size, used, filename))
+
+        list_entry.sort(key=lambda entry: entry[2])
+
+        return list_entry
+
+    # -------------------------------------------------------------------------
+    #  prune
+    #  evict least recently used entries until cache fits in max_size
+    #
+    #  argument
+    #    max_size : size limit in bytes, self.max_size if None
+    #
+    #  return
+    #    number of evicted entries
+    # -------------------------------------------------------------------------
+    def prune(self, max_size: int = None) -> int:
+        if max_size is None:
+            max_size = self.max_size
+
+        list_entry = self.get_entries()
+        total = sum(entry[1] for entry in list_entry)
+
+        n = 0
+        for key, size, used, filename in list_entry:
+            if total <= max_size:
+                break
+            shutil.rmtree(os.path.join(self.dirname, key), ignore_errors=True)
+            total -= size
+            n += 1
+
+        return n
+
+    # -------------------------------------------------------------------------
+    #  clear
+    #  evict all entries
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    number of evicted entries
+    # -------------------------------------------------------------------------
+    def clear(self) -> int:
+        return self.prune(0)
+
+
+# =============================================================================
+#  MAIN - command line tool to maintain cache
+#
+#  usage
+#    python cache.py list
+#    python cache.py prune [--max-size MB]
+#    python cache.py clear
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='maintain cache of parsed SPC workbooks')
+    parser.add_argument('--dir', default=None, help='cache directory (default: %s)' % SheetCache.dirname)
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    subparsers.add_parser('list', help='list cached workbooks')
+    parser_prune = subparsers.add_parser('prune', help='evict least recently used workbooks')
+    parser_prune.add_argument('--max-size', type=float, default=None,
+                              help='size limit in MB (default: %d)' % (SheetCache.max_size // 1024 ** 2))
+    subparsers.add_parser('clear', help='evict all workbooks')
+    args = parser.parse_args(argv)
+
+    cache = SheetCache(args.dir)
+
+    if args.command == 'list':
+        list_entry = cache.get_entries()
+        for key, size, used, filename in list_entry:
+            print('%s %8.1f MB  %s  %s' % (
+                key[:12],
+                size / 1024 ** 2,
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(used)),
+                filename,
+            ))
+        print('total %.1f MB' % (sum(entry[1] for entry in list_entry) / 1024 ** 2))
+    elif args.command == 'prune':
+        if args.max_size is None:
+            max_size = None
+        else:
+            max_size = int(args.max_size * 1024 ** 2)
+        print('%d workbook(s) evicted' % cache.prune(max_size))
+    elif args.command == 'clear':
+        print('%d workbook(s) evicted' % cache.clear())
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+# ---
+#  END OF PROGRAM
@@ -1,84 +1,321 @@
 #!/usr/bin/env python
 # coding: utf-8
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+import schema
 
 
 # =============================================================================
 #  SqlDB - handle Database for SPC Master
+#
+#  one connection is kept open per thread (sqlite3 connection must not be
+#  shared among threads) and reused for all statements of the thread
 # =============================================================================
 class SqlDB():
     # SQLite database file name
     dbname: str = None
 
-    # Transaction flag
-    OK = None
-    ERRORMSG = None
+    # schema version, see schema.py
+    version: int = None
+    # warnings of last migration, e.g. unique index not created
+    warnings: list = []
+
+    # number of prepared statements cached per connection
+    cached_statements: int = 256
+
+    # PRAGMAs applied to every new connection
+    pragmas: list = [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -64 * 1024),  # negative value is size in KiB
+        ('mmap_size', 256 * 1024 ** 2),
+        ('temp_store', 'MEMORY'),
+    ]
 
-    def __init__(self, dbname):
+    # -------------------------------------------------------------------------
+    #  argument
+    #    dbname  : SQLite database file name
+    #    migrate : False to migrate schema later by init_schema, e.g. in
+    #              worker thread, since migration of large database is slow
+    # -------------------------------------------------------------------------
+    def __init__(self, dbname, migrate: bool = True):
         self.dbname = dbname
 
+        # connection & transaction depth of each thread
+        self.local = threading.local()
+        # all connections, to be closed by close()
+        self.connections: list = []
+        self.lock = threading.Lock()
+
+        if migrate:
+            self.init_schema()
+
+    # -------------------------------------------------------------------------
+    #  OK / ERRORMSG
+    #  transaction flag of current thread, set by last statement of the thread
+    # -------------------------------------------------------------------------
+    @property
+    def OK(self):
+        return getattr(self.local, 'OK', None)
+
+    @OK.setter
+    def OK(self, value):
+        self.local.OK = value
+
+    @property
+    def ERRORMSG(self):
+        return getattr(self.local, 'ERRORMSG', None)
+
+    @ERRORMSG.setter
+    def ERRORMSG(self, value):
+        self.local.ERRORMSG = value
+
+    # -------------------------------------------------------------------------
+    #  init_schema
+    #  create / migrate tables and indexes
+    #
+    #  argument
+    #    progress : callback(version, version of latest schema), see schema.py
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def init_schema(self, progress=None):
+        warnings = []
+        try:
+            self.version = schema.migrate(self.connect(), progress, warnings)
+            self.warnings = warnings
+            self.OK = True
+            self.ERRORMSG = None
+        except Exception as e:
+            print(e)
+            self.OK = False
+            self.ERRORMSG = e
+
+    # -------------------------------------------------------------------------
+    #  needs_migration
+    #
+    #  return
+    #    True if schema has not been migrated to the latest version yet
+    # -------------------------------------------------------------------------
+    def needs_migration(self) -> bool:
+        return schema.needs_migration(self.connect())
+
+    # -------------------------------------------------------------------------
+    #  connect
+    #  get connection of current thread, open it if not opened yet
+    #
+    #  return
+    #    con : sqlite3.Connection
+    # -------------------------------------------------------------------------
+    def connect(self) -> sqlite3.Connection:
+        con = getattr(self.local, 'con', None)
+        if con is not None:
+            return con
+
+        # autocommit mode, transaction is controlled by transaction()
+        con = sqlite3.connect(
+            self.dbname,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for name, value in self.pragmas:
+            con.execute('PRAGMA %s = %s;' % (name, value))
+
+        self.local.con = con
+        self.local.depth = 0
+        with self.lock:
+            self.connections.append(con)
+
+        return con
+
+    # -------------------------------------------------------------------------
+    #  close
+    #  close all connections
+    # -------------------------------------------------------------------------
+    def close(self):
+        with self.lock:
+            for con in self.connections:
+                try:
+                    con.close()
+                except sqlite3.Error as e:
+                    print(e)
+            self.connections = []
+        self.local = threading.local()
+
+    # -------------------------------------------------------------------------
+    #  close_thread
+    #  close connection of current thread, called when worker thread ends
+    # -------------------------------------------------------------------------
+    def close_thread(self):
+        con = getattr(self.local, 'con', None)
+        if con is None:
+            return
+
+        with self.lock:
+            if con in self.connections:
+                self.connections.remove(con)
+        try:
+            con.close()
+        except sqlite3.Error as e:
+            print(e)
+        self.local.con = None
+        self.local.depth = 0
+
+    # -------------------------------------------------------------------------
+    #  transaction
+    #  context manager of transaction, statements in the scope are
+    #  committed at once or rolled back if exception is raised,
+    #  error of put / putmany / get in the scope is raised
+    #
+    #  nested scope is SAVEPOINT of outer transaction, rolled back alone
+    #  if exception is raised in it
+    #
+    #  usage:
+    #    with db.transaction():
+    #        db.put(sql1)
+    #        db.put(sql2)
+    # -------------------------------------------------------------------------
+    @contextmanager
+    def transaction(self):
+        con = self.connect()
+        if self.local.depth > 0:
+            name = 'sp%d' % self.local.depth
+            con.execute('SAVEPOINT %s;' % name)
+            self.local.depth += 1
+            try:
+                yield con
+            except BaseException:
+                self.local.depth -= 1
+                con.execute('ROLLBACK TO %s;' % name)
+                con.execute('RELEASE %s;' % name)
+                raise
+            self.local.depth -= 1
+            con.execute('RELEASE %s;' % name)
+            return
+
+        con.execute('BEGIN;')
+        self.local.depth = 1
+        try:
+            yield con
+        except BaseException:
+            self.local.depth = 0
+            con.execute('ROLLBACK;')
+            raise
+        self.local.depth = 0
+        con.execute('COMMIT;')
+
+    # -------------------------------------------------------------------------
+    #  set_error
+    #  record error of statement, raised again in transaction
+    #
+    #  argument:
+    #    e : exception
+    # -------------------------------------------------------------------------
+    def set_error(self, e: Exception):
+        print(e)
+        self.OK = False
+        self.ERRORMSG = e
+        if self.local.depth > 0:
+            raise e
+
     # -------------------------------------------------------------------------
     #  put
     #  execute SQL
     #
     #  argument:
-    #    sql : SQL statement
+    #    sql        : SQL statement, may contain ?s
+    #    parameters : values bound to ?s
     # -------------------------------------------------------------------------
-    def put(self, sql):
-        con = sqlite3.connect(self.dbname)
-        cur = con.cursor()
+    def put(self, sql, parameters=()):
+        con = self.connect()
 
         try:
-            cur.execute(sql)
-            con.commit()
+            con.execute(sql, parameters)
             self.OK = True
             self.ERRORMSG = None
         except Exception as e:
-            print(e)
-            self.OK = False
-            self.ERRORMSG = e
+            self.set_error(e)
+
+    # -------------------------------------------------------------------------
+    #  putmany
+    #  execute SQL with ?s for each row of parameters
+    #
+    #  argument:
+    #    sql  : SQL statement with ?s
+    #    rows : sequence of parameter tuples
+    # -------------------------------------------------------------------------
+    def putmany(self, sql, rows):
+        con = self.connect()
 
-        con.close()
+        try:
+            con.executemany(sql, rows)
+            self.OK = True
+            self.ERRORMSG = None
+        except Exception as e:
+            self.set_error(e)
 
     # -------------------------------------------------------------------------
     #  get
     #  query with SQL
     #
     #  argument:
-    #    sql : SQL statement
+    #    sql        : SQL statement, may contain ?s
+    #    parameters : values bound to ?s
     #
     #  return
     #    out : matrix of output
     # -------------------------------------------------------------------------
-    def get(self, sql):
-        con = sqlite3.connect(self.dbname)
-        cur = con.cursor()
+    def get(self, sql, parameters=()):
+        con = self.connect()
+        out = []
 
         try:
-            cur.execute(sql)
-            out = cur.fetchall()
+            out = con.execute(sql, parameters).fetchall()
             self.OK = True
             self.ERRORMSG = None
         except Exception as e:
-            print(e)
-            self.OK = False
-            self.ERRORMSG = e
+            self.set_error(e)
 
-        con.close()
         return out
 
     # -------------------------------------------------------------------------
-    #  sql
-    #  create sql replacing ?s by parameters
+    #  get_value
+    #  query single value with SQL
     #
     #  argument:
-    #    sentense   : SQL statement with ?s
-    #    parameters : parameters to replace
+    #    sql        : SQL statement, may contain ?s
+    #    parameters : values bound to ?s
     #
     #  return
-    #    sentense : full SQL replaced with parameters
+    #    first column of last row, None if no row
     # -------------------------------------------------------------------------
-    def sql(self, sentense, parameters):
-        for param in parameters:
-            sentense = sentense.replace('?', str(param), 1)
-        return sentense
+    def get_value(self, sql, parameters=()):
+        value = None
+        for row in self.get(sql, parameters):
+            value = row[0]
+        return value
+
+    # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+    #  lookups of SPC tables
+    # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+    def get_supplier_list(self) -> list:
+        return [row[0] for row in self.get('SELECT name_supplier_short FROM supplier;')]
+
+    def select_id_supplier(self, name_supplier: str):
+        return self.get_value('SELECT id_supplier FROM supplier WHERE name_supplier_short = ?;', (name_supplier,))
+
+    def select_id_part(self, id_supplier: int, num_part: str):
+        return self.get_value('SELECT id_part FROM part WHERE num_part = ? AND id_supplier = ?;', (num_part, id_supplier))
+
+    def select_id_param(self, id_supplier: int, id_part: int, name_param: str):
+        return self.get_value('SELECT id_param FROM param WHERE id_supplier = ? AND id_part = ? AND name_param = ?;', (id_supplier, id_part, name_param))
+
+    def select_id_batch(self, sample, timestamp: int, serial: str):
+        return self.get_value('SELECT id_batch FROM batch WHERE sample = ? AND timestamp = ? AND serial = ?;', (sample, timestamp, serial))
+
+    def select_id_measure(self, id_param: int, id_batch: int):
+        return self.get_value('SELECT id_measure FROM measure WHERE id_param = ? AND id_batch = ?;', (id_param, id_batch))
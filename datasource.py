@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# data sources of SPC chart
+#
+# Trend reads data through following methods, implemented by
+#   ExcelSPC  : Excel macro file
+#   SqlSource : database imported by DBManWin / db_import.py
+#
+#   get_part_param(row)               -> (PART, PARAMETER) of row
+#   get_SL_flag(row), set_SL_flag(row, flag)
+#   get_metrics(name_part, name_param) -> metrics dictionary, KeyError if not found
+#   get_series(name_part, name_param)  -> dataframe with 'Sample', 'Date',
+#                                         'Data Type' and name_param columns
+import numpy as np
+import pandas as pd
+
+from database import SqlDB
+from office import ExcelSPC
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# SqlSource
+#
+# description
+#   data source reading param / batch / measure tables,
+#   rows of 'Master' tab and Spec Limit flags are taken from ExcelSPC if
+#   given, otherwise rows are parameters in param table
+class SqlSource():
+    db: SqlDB = None
+    sheets: ExcelSPC = None
+    id_supplier: int = None
+
+    # param table column -> metrics field, other fields are NaN
+    dict_metrics = {
+        'num_part_excel': 'Part Number',
+        'name_param': 'Parameter Name',
+        'num_key': 'Key Parameter',
+        'lsl': 'LSL',
+        'target': 'Target',
+        'usl': 'USL',
+        'charttype': 'Chart Type',
+        'metrology': 'Metrology',
+        'multiple': 'Multiple',
+        'spectype': 'Spec Type',
+        'frozen': 'CL Frozen',
+        'lcl': 'LCL',
+        'mean': 'Avg',
+        'ucl': 'UCL',
+    }
+
+    def __init__(self, db: SqlDB, sheets: ExcelSPC = None, id_supplier: int = None):
+        self.db = db
+        self.sheets = sheets
+        self.id_supplier = id_supplier
+
+        # (num_part_excel, name_param) of rows when sheets is not given
+        self.rows: list = []
+        self.SL_flag: list = []
+        if sheets is None:
+            self.init_rows()
+
+    def init_rows(self):
+        if self.id_supplier is None:
+            sql = 'SELECT num_part_excel, name_param FROM param ORDER BY id_param;'
+            out = self.db.get(sql)
+        else:
+            sql = 'SELECT num_part_excel, name_param FROM param WHERE id_supplier = ? ORDER BY id_param;'
+            out = self.db.get(sql, (self.id_supplier,))
+        self.rows = [tuple(row) for row in out]
+        self.SL_flag = [False] * len(self.rows)
+
+    def get_filename(self) -> str:
+        return self.db.dbname
+
+    def get_num_rows(self) -> int:
+        if self.sheets is not None:
+            return len(self.sheets.get_master())
+        return len(self.rows)
+
+    def get_part_param(self, row: int):
+        if self.sheets is not None:
+            return self.sheets.get_part_param(row)
+        return self.rows[row]
+
+    def get_SL_flag(self, row: int) -> bool:
+        if self.sheets is not None:
+            return self.sheets.get_SL_flag(row)
+        return self.SL_flag[row]
+
+    def set_SL_flag(self, row: int, flag: bool):
+        if self.sheets is not None:
+            self.sheets.set_SL_flag(row, flag)
+        else:
+            self.SL_flag[row] = flag
+
+    # -------------------------------------------------------------------------
+    #  select_param
+    #  row of param table, the latest one if registered more than once
+    #
+    #  argument
+    #    name_part  : part name (tab name) in Excel file
+    #    name_param : parameter name
+    #
+    #  return
+    #    dict - column of param table -> value, KeyError if not found
+    # -------------------------------------------------------------------------
+    def select_param(self, name_part: str, name_param: str) -> dict:
+        columns = ['id_param'] + list(self.dict_metrics.keys())
+        sql = 'SELECT %s FROM param WHERE num_part_excel = ? AND name_param = ?' % ', '.join(columns)
+        parameters = [name_part, name_param]
+        if self.id_supplier is not None:
+            sql += ' AND id_supplier = ?'
+            parameters.append(self.id_supplier)
+        sql += ' ORDER BY id_param DESC LIMIT 1;'
+
+        out = self.db.get(sql, parameters)
+        if len(out) == 0:
+            raise KeyError((name_part, name_param))
+
+        return dict(zip(columns, out[0]))
+
+    # -------------------------------------------------------------------------
+    #  get_metrics
+    #
+    #  argument
+    #    name_part  : part name (tab name) in Excel file
+    #    name_param : parameter name
+    #
+    #  return
+    #    metrics dictionary with fields of ExcelSPC.get_metrics
+    # -------------------------------------------------------------------------
+    def get_metrics(self, name_part: str, name_param: str) -> dict:
+        param = self.select_param(name_part, name_param)
+
+        metrics = {key: np.nan for key in ExcelSPC.keys_metrics}
+        for column, key in self.dict_metrics.items():
+            value = param[column]
+            if value is None:
+                value = np.nan
+            metrics[key] = value
+
+        return metrics
+
+    # -------------------------------------------------------------------------
+    #  get_series
+    #  measured values of parameter in order of date, one indexed query
+    #
+    #  argument
+    #    name_part  : part name (tab name) in Excel file
+    #    name_param : parameter name
+    #
+    #  return
+    #    dataframe with 'Sample', 'Date', 'Data Type' and name_param columns,
+    #    'Data Type' is 'Historic' since database does not hold it
+    # -------------------------------------------------------------------------
+    def get_series(self, name_part: str, name_param: str) -> pd.DataFrame:
+        id_param = self.select_param(name_part, name_param)['id_param']
+
+        sql = """
+            SELECT b.sample, b.timestamp, m.value FROM measure m
+            INNER JOIN batch b ON b.id_batch = m.id_batch
+            WHERE m.id_param = ?
+            ORDER BY b.timestamp, b.sample, b.id_batch;
+        """
+        out = self.db.get(sql, (id_param,))
+
+        df = pd.DataFrame(out, columns=['Sample', 'timestamp', name_param])
+        df.insert(1, 'Date', pd.to_datetime(df['timestamp'], unit='s'))
+        df = df.drop(columns='timestamp')
+        df.insert(2, 'Data Type', 'Historic')
+        df[name_param] = df[name_param].astype(float)
+        # row number starts from 1 as data rows of Excel tab
+        df.index = pd.RangeIndex(1, len(df) + 1)
+
+        return df
+
+# ---
+# PROGRAM END
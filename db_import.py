@@ -0,0 +1,782 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# bulk import of Excel macro file for SPC into database, no Qt is required
+#
+# usage
+#   python db_import.py DB.sqlite3 PATH [PATH ...] [--jobs N] [--full]
+#     PATH : Excel macro file, directory or glob of them
+#
+#   extract : ExcelSPC -> PartRows, plain records of one part tab
+#   load    : PartRows -> batch / measure / param tables, in one transaction
+#
+# import is incremental, import_state table keeps content hash and
+# high-water mark of (timestamp, Sample) of each part tab
+import argparse
+import glob
+import hashlib
+import os
+import pandas as pd
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache import SheetCache
+from database import SqlDB
+from office import ExcelSPC
+
+# 'Master' tab header -> column of param table
+dict_header = {
+    'Key Parameter': 'num_key',
+    'Parameter Name': 'name_param',
+    'LSL': 'lsl',
+    'Target': 'target',
+    'USL': 'usl',
+    'Chart Type': 'charttype',
+    'Metrology': 'metrology',
+    'Multiple': 'multiple',
+    'Spec Type': 'spectype',
+    'CL Frozen': 'frozen',
+    'LCL': 'lcl',
+    'Avg': 'mean',
+    'UCL': 'ucl',
+}
+
+# columns of param table stored as TEXT
+param_text = ['num_key', 'charttype', 'metrology', 'multiple', 'spectype', 'frozen']
+
+# Regular Expression for supplier name from Excel filename
+pattern_supplier = re.compile(r'([a-zA-Z0-9\s]+).*SPC.*')
+# Regular Expression for part number
+pattern_part = re.compile(r'([0-9]{4}-[0-9]{3}-[0-9]{2}).*')
+
+# extensions of Excel files searched in directory
+extensions_excel = ['.xlsx', '.xlsm', '.xls']
+
+
+# -----------------------------------------------------------------------------
+#  supplier_from_filename
+#  supplier name from Excel filename
+#
+#  argument
+#    filename : Excel file
+#
+#  return
+#    Supplier name, None if not matched
+# -----------------------------------------------------------------------------
+def supplier_from_filename(filename: str):
+    name_excel = os.path.basename(filename)
+    match = pattern_supplier.match(name_excel)
+    if not match:
+        return None
+
+    name = match.group(1).strip()
+    # exception
+    if name == 'FerroTech':
+        return 'Ferrotec'
+
+    return name
+
+
+# -----------------------------------------------------------------------------
+#  get_num_part
+#  part number of database from part name of Excel tab
+#
+#  argument
+#    num_part_excel : part name (tab name) in Excel file
+#
+#  return
+#    part number, '' if not matched
+# -----------------------------------------------------------------------------
+def get_num_part(num_part_excel: str) -> str:
+    match = pattern_part.match(num_part_excel)
+    if match:
+        return match.group(1)
+    else:
+        return ''
+
+
+# -----------------------------------------------------------------------------
+#  get_param
+#  column values of param table from metrics of 'Master' tab
+#
+#  argument
+#    metrics : dictionary obtained by ExcelSPC.get_metrics
+#
+#  return
+#    dict - column of param table -> value, None for NULL
+# -----------------------------------------------------------------------------
+def get_param(metrics: dict) -> dict:
+    param = {}
+    for key, column in dict_header.items():
+        if column == 'name_param':
+            continue
+
+        value = metrics[key]
+        if column in param_text:
+            param[column] = str(value)
+        elif pd.isna(value):
+            param[column] = None
+        else:
+            param[column] = value
+
+    return param
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# ImportCancelled
+#
+# description
+#   raised in BulkImporter when cancellation is requested,
+#   transaction of the import is rolled back
+class ImportCancelled(Exception):
+    pass
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# PartRows
+#
+# description
+#   plain records of one part tab to import, no pandas object is kept
+class PartRows():
+    def __init__(self, num_part_excel: str):
+        self.num_part_excel: str = num_part_excel
+        self.num_part: str = get_num_part(num_part_excel)
+        # (name_param, column values of param table)
+        self.params: list = []
+        # batch records, one per valid row of the tab
+        self.sample: list = []
+        self.timestamp: list = []
+        self.id_lot: list = []
+        self.serial: list = []
+        # name_param -> measured values aligned to batch records, None for NULL
+        self.values: dict = {}
+        # rows skipped because of missing Sample / Date
+        self.skipped: int = 0
+        # content hash of 'Master' rows and tab
+        self.hash: str = None
+        # error message, None if no error
+        self.error: str = None
+
+    def get_keys(self) -> list:
+        return list(zip(self.sample, self.timestamp, self.serial))
+
+    # -------------------------------------------------------------------------
+    #  get_mark
+    #  high-water mark of records
+    #
+    #  return
+    #    max of (timestamp, sample), None if no record
+    # -------------------------------------------------------------------------
+    def get_mark(self):
+        if len(self.timestamp) == 0:
+            return None
+        return max(zip(self.timestamp, self.sample))
+
+    # -------------------------------------------------------------------------
+    #  get_index_after
+    #  index of records from Date of high-water mark, records of that Date
+    #  are loaded again since rows with same Date and Sample may be appended
+    #  (e.g. new serial), those imported before are skipped by ImportSession
+    #
+    #  argument
+    #    mark : (timestamp, sample), all records if None
+    #
+    #  return
+    #    list of index
+    # -------------------------------------------------------------------------
+    def get_index_after(self, mark) -> list:
+        if mark is None:
+            return list(range(len(self.timestamp)))
+        return [i for i, timestamp in enumerate(self.timestamp) if timestamp >= mark[0]]
+
+
+# -----------------------------------------------------------------------------
+#  extract_part
+#  extract records of specified part tab
+#
+#  argument
+#    sheets         : ExcelSPC instance
+#    num_part_excel : part name (tab name) in Excel file
+#
+#  return
+#    PartRows instance
+# -----------------------------------------------------------------------------
+def extract_part(sheets: ExcelSPC, num_part_excel: str) -> PartRows:
+    rows = PartRows(num_part_excel)
+
+    for name_param in sheets.get_param_list(num_part_excel):
+        metrics = sheets.get_metrics(num_part_excel, name_param)
+        rows.params.append((name_param, get_param(metrics)))
+
+    try:
+        df: pd.DataFrame = sheets.get_part_all(num_part_excel)
+    except KeyError:
+        rows.error = num_part_excel + ': tab not found'
+        return rows
+
+    h = hashlib.sha1()
+    h.update(repr(rows.params).encode())
+    h.update(repr(df.columns.tolist()).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    rows.hash = h.hexdigest()
+
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    valid = (dates.notna() & df['Sample'].notna()).to_numpy()
+    rows.skipped = int((~valid).sum())
+
+    df = df[valid]
+    # same as int(pd.Timestamp.timestamp()) of each date
+    timestamps = (dates[valid] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+    rows.sample = df['Sample'].tolist()
+    rows.timestamp = [int(t) for t in timestamps]
+    rows.id_lot = ['' if pd.isna(v) else str(v) for v in df['Job ID or Lot ID']]
+    rows.serial = [str(v) for v in df['Serial Number']]
+
+    for name_param, param in rows.params:
+        if name_param not in df.columns:
+            continue
+        rows.values[name_param] = [None if pd.isna(v) else v for v in df[name_param]]
+
+    return rows
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# ImportSession
+#
+# description
+#   id maps of one supplier used during import, preloaded with one query
+#   per table and updated as rows are inserted
+class ImportSession():
+    db: SqlDB = None
+
+    def __init__(self, db: SqlDB, id_supplier: int):
+        self.db = db
+        self.id_supplier = id_supplier
+
+        # num_part -> id_part
+        self.map_part: dict = {}
+        # (id_part, name_param) -> id_param
+        self.map_param: dict = {}
+        # num_part_excel -> (hash, timestamp, sample) of import_state
+        self.map_state: dict = {}
+        # (sample, timestamp, serial) -> id_batch
+        self.map_batch: dict = {}
+        # (id_param, id_batch) of existing measure
+        self.set_measure: set = set()
+
+    # -------------------------------------------------------------------------
+    #  preload_ids
+    #  load part / param / import_state of the supplier
+    # -------------------------------------------------------------------------
+    def preload_ids(self):
+        sql = 'SELECT num_part, id_part FROM part WHERE id_supplier = ?;'
+        self.map_part = {num_part: id_part for num_part, id_part in self.db.get(sql, (self.id_supplier,))}
+
+        sql = 'SELECT id_part, name_param, id_param FROM param WHERE id_supplier = ?;'
+        self.map_param = {(id_part, name_param): id_param
+                          for id_part, name_param, id_param in self.db.get(sql, (self.id_supplier,))}
+
+        sql = 'SELECT num_part_excel, hash, timestamp, sample FROM import_state WHERE id_supplier = ?;'
+        self.map_state = {num_part_excel: (hash, timestamp, sample)
+                          for num_part_excel, hash, timestamp, sample in self.db.get(sql, (self.id_supplier,))}
+
+    # -------------------------------------------------------------------------
+    #  preload_range
+    #  load batch / measure limited to the timestamp range
+    #
+    #  argument
+    #    t_min, t_max : timestamp range of records to import
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def preload_range(self, t_min: int, t_max: int):
+        self.map_batch = {}
+        self.update_batches(t_min, t_max)
+
+        sql = """
+            SELECT id_param, id_batch FROM measure
+            WHERE id_param IN (SELECT id_param FROM param WHERE id_supplier = ?)
+            AND id_batch IN (SELECT id_batch FROM batch WHERE timestamp BETWEEN ? AND ?);
+        """
+        self.set_measure = set(self.db.get(sql, (self.id_supplier, t_min, t_max)))
+
+    def update_params(self, id_part: int):
+        sql = 'SELECT name_param, id_param FROM param WHERE id_supplier = ? AND id_part = ?;'
+        for name_param, id_param in self.db.get(sql, (self.id_supplier, id_part)):
+            self.map_param[(id_part, name_param)] = id_param
+
+    def update_batches(self, t_min: int, t_max: int):
+        sql = 'SELECT id_batch, sample, timestamp, serial FROM batch WHERE timestamp BETWEEN ? AND ?;'
+        for id_batch, sample, timestamp, serial in self.db.get(sql, (t_min, t_max)):
+            self.map_batch[(sample, timestamp, str(serial))] = id_batch
+
+    def update_state(self, rows: PartRows):
+        mark = rows.get_mark()
+        if mark is None:
+            mark = (None, None)
+        state = (rows.hash,) + tuple(mark)
+
+        sql = 'INSERT OR REPLACE INTO import_state VALUES(?, ?, ?, ?, ?);'
+        self.db.put(sql, (self.id_supplier, rows.num_part_excel) + state)
+        self.map_state[rows.num_part_excel] = state
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# BulkImporter
+#
+# description
+#   load PartRows into database, existing ids are looked up in ImportSession
+#   and only missing rows are inserted with executemany
+#
+#   incremental import (default):
+#     - part tab with the same content hash as last import is skipped
+#     - only records after high-water mark of last import are loaded,
+#       all records if the part has new parameter(s)
+class BulkImporter():
+    db: SqlDB = None
+    session: ImportSession = None
+    incremental: bool = True
+
+    # progress(phase, done, total, message) called for each part / parameter
+    #   'extract' : done / total in part tabs
+    #   'load'    : done / total in records (parameter x row)
+    progress = None
+    # function returning True to cancel, checked between parts / parameters
+    is_cancelled = None
+
+    def __init__(self, db: SqlDB, incremental: bool = True):
+        self.db = db
+        self.incremental = incremental
+
+        # number of inserted rows
+        self.n_param: int = 0
+        self.n_batch: int = 0
+        self.n_measure: int = 0
+        # number of part tabs skipped as unchanged
+        self.n_unchanged: int = 0
+        # number of records (parameter x row) loaded / to load
+        self.n_done: int = 0
+        self.n_total: int = 0
+        # error messages
+        self.errors: list = []
+
+    # -------------------------------------------------------------------------
+    #  run
+    #  import all part tabs of Excel file in one transaction
+    #
+    #  argument
+    #    sheets      : ExcelSPC instance
+    #    id_supplier : id_supplier of supplier table
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def run(self, sheets: ExcelSPC, id_supplier: int):
+        list_part = sheets.get_unique_part_list()
+
+        list_rows = []
+        for i, num_part_excel in enumerate(list_part):
+            self.check_cancel()
+            self.report('extract', i, len(list_part), num_part_excel)
+            list_rows.append(extract_part(sheets, num_part_excel))
+        self.report('extract', len(list_part), len(list_part), '')
+
+        self.load(id_supplier, list_rows)
+
+    # -------------------------------------------------------------------------
+    #  load
+    #  load records of part tabs in one transaction,
+    #  part failed with database error is rolled back alone
+    #
+    #  argument
+    #    id_supplier : id_supplier of supplier table
+    #    list_rows   : list of PartRows instances
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def load(self, id_supplier: int, list_rows: list):
+        with self.db.transaction():
+            self.session = ImportSession(self.db, id_supplier)
+            self.session.preload_ids()
+
+            list_plan = []
+            for rows in list_rows:
+                plan = self.plan_part(rows)
+                if plan is not None:
+                    list_plan.append(plan)
+
+            list_timestamp = [rows.timestamp[i] for rows, id_part, index in list_plan for i in index]
+            if len(list_timestamp) > 0:
+                self.session.preload_range(min(list_timestamp), max(list_timestamp))
+
+            self.n_done = 0
+            self.n_total = sum(len(rows.values) * len(index) for rows, id_part, index in list_plan)
+            self.report('load', self.n_done, self.n_total, '')
+
+            for rows, id_part, index in list_plan:
+                self.check_cancel()
+                counts = (self.n_param, self.n_batch, self.n_measure)
+                try:
+                    # SAVEPOINT of the transaction
+                    with self.db.transaction():
+                        self.load_part(rows, id_part, index)
+                except sqlite3.Error as e:
+                    self.errors.append('%s: %s' % (rows.num_part_excel, e))
+                    self.n_param, self.n_batch, self.n_measure = counts
+                    # ids registered by the part are rolled back
+                    self.session.preload_ids()
+                    if len(list_timestamp) > 0:
+                        self.session.preload_range(min(list_timestamp), max(list_timestamp))
+
+    # -------------------------------------------------------------------------
+    #  plan_part
+    #  decide records of one part tab to load
+    #
+    #  argument
+    #    rows : PartRows instance
+    #
+    #  return
+    #    (rows, id_part, index of records to load), None if nothing to load
+    # -------------------------------------------------------------------------
+    def plan_part(self, rows: PartRows):
+        session = self.session
+
+        id_part = session.map_part.get(rows.num_part)
+        if id_part is None:
+            self.errors.append('%s: part %s NOT FOUND!' % (rows.num_part_excel, rows.num_part))
+            return None
+
+        state = None
+        if self.incremental:
+            state = session.map_state.get(rows.num_part_excel)
+
+        if state is not None and rows.hash is not None and state[0] == rows.hash:
+            # unchanged since last import
+            self.n_unchanged += 1
+            return None
+
+        flag_new = any((id_part, name_param) not in session.map_param for name_param, param in rows.params)
+        if state is None or state[1] is None or flag_new:
+            mark = None
+        else:
+            mark = (state[1], state[2])
+
+        return rows, id_part, rows.get_index_after(mark)
+
+    # -------------------------------------------------------------------------
+    #  load_part
+    #  load records of one part tab, sqlite3.Error is raised on failure
+    #
+    #  argument
+    #    rows    : PartRows instance
+    #    id_part : id_part of part table
+    #    index   : index of records to load
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def load_part(self, rows: PartRows, id_part: int, index: list):
+        session = self.session
+
+        if rows.error is not None:
+            self.errors.append(rows.error)
+            return
+
+        # register parameters not in database, their records are loaded below
+        list_new = [(name_param, param) for name_param, param in rows.params
+                    if (id_part, name_param) not in session.map_param]
+        if len(list_new) > 0:
+            self.insert_params(id_part, rows.num_part_excel, list_new)
+
+        if rows.skipped > 0:
+            self.errors.append('%s: %d row(s) without Sample or Date skipped' % (rows.num_part_excel, rows.skipped))
+
+        list_param = [name_param for name_param, param in rows.params if name_param in rows.values]
+        if len(list_param) > 0 and len(index) > 0:
+            # batch
+            keys = rows.get_keys()
+            keys = [keys[i] for i in index]
+            list_id_lot = [rows.id_lot[i] for i in index]
+            self.insert_batches(keys, list_id_lot)
+            list_id_batch = [session.map_batch[key] for key in keys]
+
+            # measure, one executemany per parameter
+            for name_param in list_param:
+                self.check_cancel()
+                id_param = session.map_param[(id_part, name_param)]
+                values = rows.values[name_param]
+                list_measure = []
+                for i, id_batch in zip(index, list_id_batch):
+                    if (id_param, id_batch) in session.set_measure:
+                        continue
+                    session.set_measure.add((id_param, id_batch))
+                    list_measure.append((id_param, id_batch, values[i]))
+
+                if len(list_measure) > 0:
+                    self.db.putmany('INSERT OR IGNORE INTO measure VALUES(NULL, ?, ?, ?);', list_measure)
+                    self.n_measure += len(list_measure)
+
+                self.n_done += len(index)
+                self.report('load', self.n_done, self.n_total, '%s : %s' % (rows.num_part_excel, name_param))
+
+        session.update_state(rows)
+
+    # -------------------------------------------------------------------------
+    #  insert_params
+    #  insert new parameters of the part and register their ids
+    #
+    #  argument
+    #    id_part        : id_part of part table
+    #    num_part_excel : part name (tab name) in Excel file
+    #    list_new       : list of (name_param, column values of param table)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def insert_params(self, id_part: int, num_part_excel: str, list_new: list):
+        list_row = []
+        for name_param, param in list_new:
+            list_row.append((
+                self.session.id_supplier,
+                id_part,
+                str(num_part_excel),
+                str(name_param),
+                param['num_key'],
+                param['lsl'],
+                param['target'],
+                param['usl'],
+                param['charttype'],
+                param['metrology'],
+                param['multiple'],
+                param['spectype'],
+                param['frozen'],
+                param['lcl'],
+                param['mean'],
+                param['ucl'],
+            ))
+
+        self.db.putmany('INSERT OR IGNORE INTO param VALUES(NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);', list_row)
+        self.n_param += len(list_row)
+
+        # read generated ids back
+        self.session.update_params(id_part)
+
+    # -------------------------------------------------------------------------
+    #  insert_batches
+    #  insert batches not in database and register their ids
+    #
+    #  argument
+    #    keys        : (sample, timestamp, serial) of records
+    #    list_id_lot : 'Job ID or Lot ID' of records
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def insert_batches(self, keys: list, list_id_lot: list):
+        map_batch = self.session.map_batch
+
+        list_batch = []
+        set_new = set()
+        for key, id_lot in zip(keys, list_id_lot):
+            if key in map_batch or key in set_new:
+                continue
+            set_new.add(key)
+            sample, timestamp, serial = key
+            list_batch.append((sample, timestamp, id_lot, serial))
+
+        if len(list_batch) == 0:
+            return
+
+        self.db.putmany('INSERT OR IGNORE INTO batch VALUES(NULL, ?, ?, ?, ?);', list_batch)
+        self.n_batch += len(list_batch)
+
+        # read generated ids back
+        list_timestamp = [timestamp for sample, timestamp, serial in set_new]
+        self.session.update_batches(min(list_timestamp), max(list_timestamp))
+
+    def report(self, phase: str, done: int, total: int, message: str):
+        if self.progress is not None:
+            self.progress(phase, done, total, message)
+
+    def check_cancel(self):
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise ImportCancelled()
+
+
+# -----------------------------------------------------------------------------
+#  extract_workbook
+#  extract records of all part tabs of Excel file, run in worker process
+#
+#  argument
+#    filename      : Excel file
+#    dirname_cache : directory of SheetCache, None if cache is not used
+#
+#  return
+#    (filename, list of PartRows, error message or None)
+# -----------------------------------------------------------------------------
+def extract_workbook(filename: str, dirname_cache: str = None):
+    if dirname_cache is None:
+        cache = None
+    else:
+        cache = SheetCache(dirname_cache)
+
+    try:
+        sheets = ExcelSPC(filename, lazy=True, cache=cache)
+        if sheets.valid is not True:
+            return filename, [], 'Not appropriate format!'
+        list_rows = [extract_part(sheets, num_part_excel) for num_part_excel in sheets.get_unique_part_list()]
+        sheets.close()
+    except Exception as e:
+        return filename, [], str(e)
+
+    return filename, list_rows, None
+
+
+# -----------------------------------------------------------------------------
+#  find_workbooks
+#  Excel files of specified paths
+#
+#  argument
+#    paths : Excel files, directories or globs
+#
+#  return
+#    list of Excel files
+# -----------------------------------------------------------------------------
+def find_workbooks(paths: list) -> list:
+    list_file = []
+    for path in paths:
+        if os.path.isdir(path):
+            list_path = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            list_path = sorted(glob.glob(path))
+
+        for filename in list_path:
+            # lock file of opened Excel file
+            if os.path.basename(filename).startswith('~$'):
+                continue
+            if os.path.splitext(filename)[1].lower() in extensions_excel and filename not in list_file:
+                list_file.append(filename)
+
+    return list_file
+
+
+# -----------------------------------------------------------------------------
+#  import_workbooks
+#  parse Excel files in worker processes and load them with one writer,
+#  one transaction per Excel file
+#
+#  argument
+#    db            : SqlDB instance, the only writer
+#    list_file     : Excel files
+#    jobs          : number of worker processes, number of CPUs if None,
+#                    parsed in this process if 1
+#    incremental   : False to import all records
+#    name_supplier : supplier name, obtained from filename if None
+#    dirname_cache : directory of SheetCache, None if cache is not used
+#
+#  return
+#    number of Excel files failed to import
+# -----------------------------------------------------------------------------
+def import_workbooks(db: SqlDB, list_file: list, jobs: int = None, incremental: bool = True,
+                     name_supplier: str = None, dirname_cache: str = None) -> int:
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(list_file)))
+
+    n_error = 0
+    for filename, list_rows, error in iter_extracted(list_file, jobs, dirname_cache):
+        if error is not None:
+            print(filename + ': ' + error, file=sys.stderr)
+            n_error += 1
+            continue
+
+        if name_supplier is None:
+            name = supplier_from_filename(filename)
+        else:
+            name = name_supplier
+
+        id_supplier = db.select_id_supplier(name)
+        if id_supplier is None:
+            print('%s: supplier %s NOT FOUND!' % (filename, name), file=sys.stderr)
+            n_error += 1
+            continue
+
+        time_start = time.perf_counter()
+        importer = BulkImporter(db, incremental)
+        importer.load(id_supplier, list_rows)
+
+        print('%s: %s, param = %d, batch = %d, measure = %d, unchanged part(s) = %d, %.1f sec' % (
+            filename, name, importer.n_param, importer.n_batch, importer.n_measure, importer.n_unchanged,
+            time.perf_counter() - time_start))
+        for msg in importer.errors:
+            print(filename + ': ' + msg, file=sys.stderr)
+        if len(importer.errors) > 0:
+            n_error += 1
+
+    return n_error
+
+
+def iter_extracted(list_file: list, jobs: int, dirname_cache: str):
+    if jobs <= 1:
+        for filename in list_file:
+            yield extract_workbook(filename, dirname_cache)
+        return
+
+    # write whichever workbook is parsed first
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(extract_workbook, filename, dirname_cache) for filename in list_file]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# =============================================================================
+#  MAIN
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='import Excel macro files for SPC into database')
+    parser.add_argument('db', help='SQLite file')
+    parser.add_argument('paths', nargs='+', help='Excel macro file(s), directory or glob')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--full', action='store_true', help='import all records, not only new ones')
+    parser.add_argument('--supplier', default=None, help='supplier name (default: from filename)')
+    parser.add_argument('--cache-dir', default=None, help='cache directory (default: %s)' % SheetCache.dirname)
+    parser.add_argument('--no-cache', action='store_true', help='do not use cache of parsed Excel file')
+    args = parser.parse_args(argv)
+
+    list_file = find_workbooks(args.paths)
+    if len(list_file) == 0:
+        print('no Excel file to import', file=sys.stderr)
+        return 1
+
+    if args.no_cache:
+        dirname_cache = None
+    else:
+        dirname_cache = SheetCache(args.cache_dir).dirname
+
+    db = SqlDB(args.db, migrate=False)
+    db.init_schema(lambda version, n: print('%s: migrating schema to version %d/%d' % (args.db, version, n), file=sys.stderr))
+    if not db.OK:
+        print(args.db + ': ' + str(db.ERRORMSG), file=sys.stderr)
+        return 1
+    for msg in db.warnings:
+        print(args.db + ': ' + msg, file=sys.stderr)
+
+    time_start = time.perf_counter()
+    n_error = import_workbooks(db, list_file, args.jobs, not args.full, args.supplier, dirname_cache)
+    db.close()
+
+    print('%d file(s), %d error(s), %.1f sec' % (len(list_file), n_error, time.perf_counter() - time_start))
+
+    return 0 if n_error == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+# ---
+# PROGRAM END
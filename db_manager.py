@@ -1,8 +1,6 @@
-import math
 import os.path
-import pandas as pd
-import re
-from PySide2.QtCore import Slot
+import time
+from PySide2.QtCore import QThread, Signal, Slot
 from PySide2.QtGui import QIcon
 from PySide2.QtWidgets import (
     QComboBox,
@@ -22,13 +20,122 @@ from PySide2.QtWidgets import (
     QWidget,
 )
 from database import SqlDB
+from db_import import BulkImporter, ImportCancelled, supplier_from_filename
+from office import ExcelSPC
 from resource import Icons
 
 
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# ImportWorker
+#
+# description
+#   import Excel data into database in background thread,
+#   SqlDB opens own connection for this thread, closed when run ends
+class ImportWorker(QThread):
+    # done, total, message with throughput and ETA
+    progress = Signal(int, int, str)
+    # BulkImporter instance of completed import
+    imported = Signal(object)
+    # error message
+    failed = Signal(str)
+
+    def __init__(self, parent: QMainWindow, db: SqlDB, sheets: ExcelSPC, id_supplier: int):
+        super().__init__(parent=parent)
+        self.db: SqlDB = db
+        self.sheets: ExcelSPC = sheets
+        self.id_supplier: int = id_supplier
+        self.time_load: float = None
+
+    def run(self):
+        importer = BulkImporter(self.db)
+        importer.progress = self.report
+        importer.is_cancelled = self.isInterruptionRequested
+
+        try:
+            importer.run(self.sheets, self.id_supplier)
+        except ImportCancelled:
+            self.failed.emit('Import cancelled, database is not changed')
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            # connection of this thread is not used any more
+            self.db.close_thread()
+
+        self.imported.emit(importer)
+
+    # -------------------------------------------------------------------------
+    #  report
+    #  progress callback of BulkImporter
+    #
+    #  argument
+    #    phase   : 'extract' or 'load'
+    #    done    : number of processed parts / records
+    #    total   : number of parts / records
+    #    message : part (and parameter) being processed
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def report(self, phase: str, done: int, total: int, message: str):
+        if phase == 'extract':
+            self.progress.emit(done, total, 'Read ' + message + ' (' + str(done) + '/' + str(total) + ')')
+            return
+
+        if self.time_load is None:
+            self.time_load = time.perf_counter()
+
+        elapsed = time.perf_counter() - self.time_load
+        if done == 0 or elapsed <= 0:
+            self.progress.emit(done, total, 'Import ' + message)
+            return
+
+        rate = done / elapsed
+        eta = int((total - done) / rate)
+        self.progress.emit(done, total, 'Import %s, %.0f rows/s, ETA %d:%02d' % (message, rate, eta // 60, eta % 60))
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# MigrateWorker
+#
+# description
+#   migrate database schema in background thread, creating indexes of
+#   large database takes long
+class MigrateWorker(QThread):
+    # version, version of latest schema, message
+    progress = Signal(int, int, str)
+    # warnings of migration, e.g. unique index not created
+    migrated = Signal(list)
+    # error message
+    failed = Signal(str)
+
+    def __init__(self, parent: QMainWindow, db: SqlDB):
+        super().__init__(parent=parent)
+        self.db: SqlDB = db
+
+    def run(self):
+        try:
+            self.db.init_schema(self.report)
+            if not self.db.OK:
+                self.failed.emit(str(self.db.ERRORMSG))
+                return
+        finally:
+            # connection of this thread is not used any more
+            self.db.close_thread()
+
+        self.migrated.emit(self.db.warnings)
+
+    def report(self, version: int, n: int):
+        self.progress.emit(version, n, 'Migrating database schema (%d/%d) ...' % (version, n))
+
+
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class DBManWin(QMainWindow):
     parent = None
     db = None
+    worker: ImportWorker = None
+    migrator: MigrateWorker = None
     flag_db = False
     config = None
     confFile = None
@@ -36,10 +143,6 @@ class DBManWin(QMainWindow):
     w_init: int = 600
     h_init: int = 200
 
-    # Regular Expression
-    pattern1: str = re.compile(r'([a-zA-Z0-9\s]+).*SPC.*')
-    pattern2: str = re.compile(r'([0-9]{4}-[0-9]{3}-[0-9]{2}).*')
-
     def __init__(self, parent: QMainWindow):
         super().__init__(parent=parent)
         self.icons = Icons()
@@ -156,35 +259,40 @@ class DBManWin(QMainWindow):
         combo_name_supplier.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         combo_name_supplier.setStyleSheet("QComboBox:disabled {color:black; background-color:white;}");
 
-        but_db_add = QPushButton()
-        but_db_add.setIcon(QIcon(self.icons.DBADD))
-        but_db_add.setEnabled(self.flag_db)
-        but_db_add.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-        but_db_add.setStatusTip('add Excel data to database')
-        but_db_add.clicked.connect(lambda: self.updateDB(combo_name_supplier))
+        self.but_db_add = QPushButton()
+        self.but_db_add.setIcon(QIcon(self.icons.DBADD))
+        self.but_db_add.setEnabled(self.flag_db)
+        self.but_db_add.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.but_db_add.setStatusTip('add Excel data to database')
+        self.but_db_add.clicked.connect(lambda: self.updateDB(combo_name_supplier))
 
         grid.addWidget(lab_name_supplier, row, 0)
         grid.addWidget(combo_name_supplier, row, 1)
-        grid.addWidget(but_db_add, row, 2)
+        grid.addWidget(self.but_db_add, row, 2)
 
         row += 1
 
         # for status bar
-        statusLabel = QLabel("Showing Progress")
-        statusLabel.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.statusLabel = QLabel("Showing Progress")
+        self.statusLabel.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Fixed)
 
         self.progressbar = QProgressBar()
         self.progressbar.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         self.progressbar.setMinimum(0)
         self.progressbar.setMaximum(100)
-        self.progressbar.setValue(10)
+        self.progressbar.setValue(0)
 
-        # statusBar = QStatusBar()
+        self.tool_cancel: QToolButton = QToolButton()
+        self.tool_cancel.setIcon(QIcon(self.icons.CLOSE))
+        self.tool_cancel.setStatusTip('Cancel import')
+        self.tool_cancel.clicked.connect(self.cancelImport)
+        self.tool_cancel.hide()
 
         # Status Bar
         self.statusbar: QStatusBar = QStatusBar()
-        self.statusbar.addWidget(statusLabel, 1)
+        self.statusbar.addWidget(self.statusLabel, 1)
         self.statusbar.addWidget(self.progressbar, 2)
+        self.statusbar.addPermanentWidget(self.tool_cancel)
         self.setStatusBar(self.statusbar)
 
         self.resize(self.w_init, self.h_init)
@@ -215,10 +323,8 @@ class DBManWin(QMainWindow):
             return
 
         # DB Query and update QConboBox
-        sql = "SELECT name_supplier_short FROM supplier;"
-        out = self.db.get(sql)
-        for supplier in out:
-            combo.addItem(supplier[0])
+        for name_supplier in self.db.get_supplier_list():
+            combo.addItem(name_supplier)
 
         name = self.get_supplier_name()
         index = combo.findText(name)
@@ -241,20 +347,8 @@ class DBManWin(QMainWindow):
     def get_supplier_name(self):
         if self.parent.sheets is None:
             return 'Unknown'
-        else:
-            name_excel = os.path.basename(self.parent.sheets.get_filename())
-
-        print(name_excel)
-        match: bool = self.pattern1.match(name_excel)
-        if match:
-            name = match.group(1).strip()
 
-            print(name)
-            # exception
-            if name == 'FerroTech':
-                return 'Ferrotec'
-
-            return name
+        return supplier_from_filename(self.parent.sheets.get_filename())
 
     # -------------------------------------------------------------------------
     #  openFile
@@ -281,8 +375,8 @@ class DBManWin(QMainWindow):
         if not os.path.exists(dbname):
             return
         else:
-            # make SqlDB instance
-            self.db = SqlDB(dbname)
+            # make SqlDB instance, schema is migrated in background
+            self.db = SqlDB(dbname, migrate=False)
 
             # set dbname in config file
             self.config.set('Database', 'DBNAME', dbname)
@@ -290,6 +384,64 @@ class DBManWin(QMainWindow):
                 self.config.write(file)
 
         ent.setText(dbname)
+        self.migrateDB()
+
+    # -------------------------------------------------------------------------
+    #  migrateDB
+    #  migrate schema of database in background if not migrated yet
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def migrateDB(self):
+        if not self.db.needs_migration():
+            self.db.init_schema()
+            return
+
+        self.migrator = MigrateWorker(self, self.db)
+        self.migrator.progress.connect(self.handleMigrateProgress)
+        self.migrator.migrated.connect(self.handleMigrated)
+        self.migrator.failed.connect(self.handleImportFailed)
+        self.migrator.finished.connect(self.handleImportFinished)
+
+        self.but_db_add.setEnabled(False)
+        self.progressbar.setRange(0, 0)
+        self.statusLabel.setText('Migrating database schema ...')
+
+        self.migrator.start()
+
+    # -------------------------------------------------------------------------
+    #  handleMigrateProgress
+    #
+    #  argument
+    #    version : version being migrated to
+    #    n       : version of latest schema
+    #    message : progress message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(int, int, str)
+    def handleMigrateProgress(self, version: int, n: int, message: str):
+        self.statusLabel.setText(message)
+
+    # -------------------------------------------------------------------------
+    #  handleMigrated
+    #
+    #  argument
+    #    warnings : warnings of migration
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(list)
+    def handleMigrated(self, warnings: list):
+        self.statusLabel.setText('Database schema migrated')
+        if len(warnings) > 0:
+            QMessageBox.warning(self, 'Database', '\n'.join(warnings))
 
     # -------------------------------------------------------------------------
     #  updateDB
@@ -302,216 +454,122 @@ class DBManWin(QMainWindow):
     #    (none)
     # -------------------------------------------------------------------------
     def updateDB(self, combo: QComboBox):
+        if self.worker is not None and self.worker.isRunning():
+            return
+        if self.migrator is not None and self.migrator.isRunning():
+            return
+
         name_supplier = combo.currentText()
 
         # id_supplier
-        id_supplier = self.select_id_supplier(name_supplier)
+        id_supplier = self.db.select_id_supplier(name_supplier)
         if id_supplier is None:
             return
 
-        print('Suuplier :', name_supplier, ', id_supplier =', id_supplier)
-
-        dict_header = {
-            'Key Parameter': 'num_key',
-            'Parameter Name': 'name_param',
-            'LSL': 'lsl',
-            'Target': 'target',
-            'USL': 'usl',
-            'Chart Type': 'charttype',
-            'Metrology': 'metrology',
-            'Multiple': 'multiple',
-            'Spec Type': 'spectype',
-            'CL Frozen': 'frozen',
-            'LCL': 'lcl',
-            'Avg': 'mean',
-            'UCL': 'ucl',
-        }
-
-        list_part = self.parent.sheets.get_unique_part_list()
-        for num_part_excel in list_part:
-
-            match: bool = self.pattern2.match(num_part_excel)
-            if match:
-                num_part = match.group(1)
-            else:
-                num_part = ''
-
-            print(num_part_excel, num_part)
-
-            # id_part
-            id_part = self.select_id_part(id_supplier, num_part)
-            if id_part is None:
-                print('id_part NOT FOUND!')
-                continue
-
-            print('PART# :', num_part, ', id_part =', id_part)
-
-            list_param = self.parent.sheets.get_param_list(num_part_excel)
-            for name_param in list_param:
-                # print(num_part_excel, name_param)
-                metrics = self.parent.sheets.get_metrics(num_part_excel, name_param)
-                param = self.get_param(metrics)
-
-                # id_param
-                id_param = self.select_id_param(id_part, id_supplier, name_param)
-                if id_param is None:
-                    self.insert_param(id_part, id_supplier, name_param, num_part_excel, param)
-                else:
-                    print('### SPC Data')
-                    print('> PART# :', num_part, ', Parameter :', name_param, ', id_param =', id_param)
-                    df: pd.DataFrame = self.parent.sheets.get_part_all(num_part_excel)
-                    for r in range(len(df)):
-                        df_r: pd.Series = df.iloc[r]
-                        # batch
-                        # id_batch INTEGER
-                        # 'Sample' => sample INTEGER,
-                        # 'Date' => timestamp INTEGER,
-                        # 'Job ID or Lot ID' => id_lot TEXT,
-                        # 'Serial Number' => serial,
-                        sample = df_r['Sample']
-                        timestamp = int(pd.to_datetime(df_r['Date']).timestamp())
-
-                        id_lot = df_r['Job ID or Lot ID']
-                        if math.isnan(id_lot):
-                            id_lot = ''
-
-                        serial = df_r['Serial Number']
-
-                        measured = df_r[name_param]
-                        if math.isnan(measured):
-                            measured = 'NULL'
-
-                        # print(sample, timestamp, id_lot, serial, value)
-
-                        # id_batch
-                        id_batch = self.select_id_batch(sample, serial, timestamp)
-                        if id_batch is None:
-                            self.insert_batch(id_lot, sample, serial, timestamp)
-                            id_batch = self.select_id_batch(sample, serial, timestamp)
-
-                        # id_measure
-                        id_measure = self.select_id_measure(id_batch, id_param)
-                        if id_measure is None:
-                            self.insert_measure(id_batch, id_param, measured)
-
-    def get_param(self, metrics):
-        param = {}
-        # param_num_key = metrics['Key Parameter']
-        param['num_key'] = metrics['Key Parameter']
-        # param_lsl = metrics['LSL']
-        param['lsl'] = metrics['LSL']
-        if math.isnan(param['lsl']):
-            param['lsl'] = 'NULL'
-        # param_target = metrics['Target']
-        param['target'] = metrics['Target']
-        if math.isnan(param['target']):
-            param['target'] = 'NULL'
-        # param_usl = metrics['USL']
-        param['usl'] = metrics['USL']
-        if math.isnan(param['usl']):
-            param['usl'] = 'NULL'
-        # param_charttype = metrics['Chart Type']
-        param['charttype'] = metrics['Chart Type']
-        # param_metrology = metrics['Metrology']
-        param['metrology'] = metrics['Metrology']
-        # param_multiple = metrics['Multiple']
-        param['multiple'] = metrics['Multiple']
-        # param_spectype = metrics['Spec Type']
-        param['spectype'] = metrics['Spec Type']
-        # param_frozen = metrics['CL Frozen']
-        param['frozen'] = metrics['CL Frozen']
-        # param_lcl = metrics['LCL']
-        param['lcl'] = metrics['LCL']
-        if math.isnan(param['lcl']):
-            param['lcl'] = 'NULL'
-        # param_mean = metrics['Avg']
-        param['mean'] = metrics['Avg']
-        if math.isnan(param['mean']):
-            param['mean'] = 'NULL'
-        # param_ucl = metrics['UCL']
-        param['ucl'] = metrics['UCL']
-        if math.isnan(param['ucl']):
-            param['ucl'] = 'NULL'
-        return param
-
-    def select_id_supplier(self, name_supplier):
-        sql = self.db.sql("SELECT id_supplier FROM supplier WHERE name_supplier_short = '?';", [name_supplier])
-        # print(sql1)
-        out = self.db.get(sql)
-        id_supplier = None
-        for id in out:
-            id_supplier = id[0]
-        return id_supplier
-
-    def select_id_part(self, id_supplier, num_part):
-        sql = self.db.sql("SELECT id_part FROM part WHERE num_part = '?' AND id_supplier = ?;", [num_part, id_supplier])
-        # print(sql2)
-        out = self.db.get(sql)
-        id_part = None
-        for id in out:
-            id_part = id[0]
-        return id_part
-
-    def select_id_param(self, id_part, id_supplier, name_param):
-        sql = self.db.sql("SELECT id_param FROM param WHERE id_supplier = ? AND id_part = ? AND name_param = '?';", [id_supplier, id_part, name_param])
-        # print(sql3)
-        out = self.db.get(sql)
-        id_param = None
-        for id in out:
-            id_param = id[0]
-        return id_param
-
-    def insert_param(self, id_part, id_supplier, name_param, num_part_excel, param):
-        sql = self.db.sql("INSERT INTO param VALUES(NULL, ?, ?, '?', '?', '?', ?, ?, ?, '?', '?', '?', '?', '?', ?, ?, ?);",
-                          [
-                              id_supplier,
-                              id_part,
-                              num_part_excel,
-                              name_param,
-                              param['num_key'],
-                              param['lsl'],
-                              param['target'],
-                              param['usl'],
-                              param['charttype'],
-                              param['metrology'],
-                              param['multiple'],
-                              param['spectype'],
-                              param['frozen'],
-                              param['lcl'],
-                              param['mean'],
-                              param['ucl']
-                          ]
-                          )
-        # print(sql4)
-        self.db.put(sql)
-
-    def select_id_batch(self, sample, serial, timestamp):
-        sql = self.db.sql("SELECT id_batch FROM batch WHERE sample = ? AND timestamp = ? AND serial = '?';", [sample, timestamp, serial])
-        out = self.db.get(sql)
-        id_batch = None
-        for id in out:
-            id_batch = id[0]
-        return id_batch
-
-    def insert_batch(self, id_lot, sample, serial, timestamp):
-        sql = self.db.sql("INSERT INTO batch VALUES(NULL, ?, ?, '?', '?');", [sample, timestamp, id_lot, serial])
-        # print(sql)
-        self.db.put(sql)
-
-    def select_id_measure(self, id_batch, id_param):
-        sql = self.db.sql("SELECT id_measure FROM measure WHERE id_param = ? AND id_batch = ?;", [id_param, id_batch])
-        # print(sql)
-        out = self.db.get(sql)
-        id_measure = None
-        for id in out:
-            id_measure = id[0]
-
-        return id_measure
-
-    def insert_measure(self, id_batch, id_param, measured):
-        sql = self.db.sql("INSERT INTO measure VALUES(NULL, ?, ?, ?);", [id_param, id_batch, measured])
-        # print(sql)
-        self.db.put(sql)
+        self.worker = ImportWorker(self, self.db, self.parent.sheets, id_supplier)
+        self.worker.progress.connect(self.handleImportProgress)
+        self.worker.imported.connect(self.handleImported)
+        self.worker.failed.connect(self.handleImportFailed)
+        self.worker.finished.connect(self.handleImportFinished)
+
+        self.but_db_add.setEnabled(False)
+        self.progressbar.setRange(0, 0)
+        self.tool_cancel.show()
+        self.statusLabel.setText('Importing ...')
+
+        self.worker.start()
+
+    # -------------------------------------------------------------------------
+    #  handleImportProgress
+    #
+    #  argument
+    #    done    : number of processed parts / records
+    #    total   : number of parts / records
+    #    message : progress message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(int, int, str)
+    def handleImportProgress(self, done: int, total: int, message: str):
+        if self.sender() is not self.worker:
+            return
+
+        self.progressbar.setRange(0, max(total, 1))
+        self.progressbar.setValue(done)
+        self.statusLabel.setText(message)
+
+    # -------------------------------------------------------------------------
+    #  handleImported
+    #
+    #  argument
+    #    importer : BulkImporter instance of completed import
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(object)
+    def handleImported(self, importer: BulkImporter):
+        self.statusLabel.setText('Imported %d param(s), %d batch(es), %d measure(s), %d part(s) unchanged' % (
+            importer.n_param, importer.n_batch, importer.n_measure, importer.n_unchanged))
+
+        if len(importer.errors) > 0:
+            QMessageBox.warning(self, 'Import', '\n'.join(importer.errors))
+
+    # -------------------------------------------------------------------------
+    #  handleImportFailed
+    #
+    #  argument
+    #    msg : error message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(str)
+    def handleImportFailed(self, msg: str):
+        self.statusLabel.setText(msg)
+
+    # -------------------------------------------------------------------------
+    #  handleImportFinished
+    #  import or migration has been completed, failed or cancelled
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def handleImportFinished(self):
+        sender = self.sender()
+        if sender is not self.worker and sender is not self.migrator:
+            return
+
+        self.tool_cancel.hide()
+        self.tool_cancel.setEnabled(True)
+        self.progressbar.setRange(0, 100)
+        self.progressbar.setValue(0)
+        self.but_db_add.setEnabled(self.flag_db)
+
+    # -------------------------------------------------------------------------
+    #  cancelImport
+    #  cancel import in background, rolled back at next part / parameter,
+    #  the end of import is handled by handleImportFinished
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def cancelImport(self):
+        if self.worker is None or not self.worker.isRunning():
+            return
+
+        self.worker.requestInterruption()
+        self.tool_cancel.setEnabled(False)
+        self.statusLabel.setText('Cancelling ...')
 
     # -------------------------------------------------------------------------
     #  closeEvent
@@ -537,10 +595,12 @@ class DBManWin(QMainWindow):
         if sender is not None:
             # Exit button is clicked
             if reply == QMessageBox.Yes:
+                self.cancelImport()
                 self.destroy()
         else:
             # x on the window is clicked
             if reply == QMessageBox.Yes:
+                self.cancelImport()
                 event.accept()
             else:
                 event.ignore()
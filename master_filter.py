@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# sort keys, indexes and filter query of 'Master' tab
+#
+# query syntax
+#   query      := term ( [ 'and' | 'or' ] term )*     'and' binds tighter,
+#                                                    omitted operator is 'and'
+#   term       := 'not' term | '(' query ')' | comparison | word
+#   comparison := column op value
+#   op         := '<' | '<=' | '>' | '>=' | '=' | '==' | '!=' | '~'
+#
+#   column is name of 'Master' column or alias, case insensitive,
+#   '~' is substring match, word alone matches Part Number or Parameter Name,
+#   column not followed by op is searched as word, e.g. 'key', 'Flatness Avg',
+#   '<' '<=' '>' '>=' compare numbers only, text values of column are excluded
+#
+#   e.g. Cpk < 1.33 and Recent OOC > 0
+#        Part = ABC-123 and (Spec Type = Two-Sided or Parameter ~ width)
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class QueryError(Exception):
+    pass
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# MasterIndex
+#
+# description
+#   column arrays of 'Master' dataframe with precomputed sort orders,
+#   inverted index of text columns and sorted index of numeric columns
+#   listed in indexed_columns, built once per workbook
+class MasterIndex():
+    # columns indexed at construction, others are scanned on demand
+    indexed_columns = ['Part Number', 'Parameter Name', 'Spec Type', 'Cpk for Recent Points']
+
+    # short names usable in query
+    aliases = {
+        'part': 'Part Number',
+        'param': 'Parameter Name',
+        'parameter': 'Parameter Name',
+        'spec': 'Spec Type',
+        'cpk': 'Cpk for Recent Points',
+        'recent ooc': '%OOC for Recent Points',
+        'ooc': '%OOC for Recent Points',
+        'ppm': 'PPM for Recent Points',
+        'key': 'Key Parameter',
+    }
+
+    # columns searched by word without column name
+    search_columns = ['Part Number', 'Parameter Name']
+
+    def __init__(self, df: pd.DataFrame):
+        self.df: pd.DataFrame = df
+        self.columns: list = list(df.columns)
+        self.num_rows: int = len(df)
+
+        # column -> float array (NaN if not number) or lower-case str array,
+        # converted when column is used first
+        self.numbers: dict = {}
+        self.texts: dict = {}
+        # text column -> float array of values convertible to number, else NaN
+        self.coerced: dict = {}
+
+        # column -> ascending order of rows, built lazily except indexed ones
+        self.orders: dict = {}
+
+        # text column -> {lower-case value: row array}
+        self.inverted: dict = {}
+        for name in self.indexed_columns:
+            if name not in self.columns:
+                continue
+            if self.is_number(name):
+                self.get_order(name)
+            else:
+                self.build_inverted(name)
+
+        # column names matched in query, longest first
+        names = {name.lower(): name for name in self.columns}
+        names.update({alias: name for alias, name in self.aliases.items() if name in self.columns})
+        self.names: dict = names
+        keys = sorted(names.keys(), key=len, reverse=True)
+        # column name must end at delimiter, e.g. 'LSL-1' is word
+        pattern = '|'.join(re.escape(key) + r'(?=[\s()<>=!~"]|$)' for key in keys)
+        self.pattern_token = re.compile(
+            r'\s*(?:(?P<column>%s)|(?P<op><=|>=|==|!=|<|>|=|~)|(?P<paren>[()])'
+            r'|"(?P<quoted>[^"]*)"|(?P<word>[^\s()<>=!~"]+))' % pattern,
+            re.IGNORECASE,
+        )
+
+    # -------------------------------------------------------------------------
+    #  is_number
+    #  convert column to array, number or text
+    #
+    #  argument
+    #    name : column name
+    #
+    #  return
+    #    True if all values of column are number
+    # -------------------------------------------------------------------------
+    def is_number(self, name: str) -> bool:
+        if name in self.numbers:
+            return True
+        if name in self.texts:
+            return False
+
+        series = self.df[name]
+        if self.is_number_like(series):
+            numbers = pd.to_numeric(series, errors='coerce')
+            if series.dtype == object and numbers.notna().sum() < series.notna().sum():
+                # percentage may be written as text, e.g. '5%'
+                numbers = pd.to_numeric(series.astype(str).str.rstrip('%'), errors='coerce')
+            if numbers.notna().sum() == series.notna().sum():
+                self.numbers[name] = numbers.to_numpy(dtype=float)
+                return True
+
+        self.texts[name] = series.astype(object).where(series.notna(), '').astype(str).str.lower().to_numpy(dtype=object)
+        return False
+
+    @staticmethod
+    def is_number_like(series: pd.Series) -> bool:
+        # first value decides, to skip costly conversion of text column
+        values = series.dropna()
+        if len(values) == 0:
+            return False
+        try:
+            float(str(values.iloc[0]).rstrip('%'))
+        except ValueError:
+            return False
+        return True
+
+    # -------------------------------------------------------------------------
+    #  build_inverted
+    #  inverted index of text column
+    #
+    #  argument
+    #    name : column name
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def build_inverted(self, name: str):
+        order = self.get_order(name)
+        values = self.texts[name][order]
+        # boundaries of runs of same value in sorted order
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) > 0 else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(values)]
+        self.inverted[name] = {values[s]: np.sort(order[s:e]) for s, e in zip(starts, ends)}
+
+    # -------------------------------------------------------------------------
+    #  get_order
+    #  stable ascending order of rows by column, NaN at the end
+    #
+    #  argument
+    #    name : column name
+    #
+    #  return
+    #    numpy array of row numbers
+    # -------------------------------------------------------------------------
+    def get_order(self, name: str) -> np.ndarray:
+        order = self.orders.get(name)
+        if order is None:
+            if self.is_number(name):
+                # NaN is sorted to the end by argsort
+                order = np.argsort(self.numbers[name], kind='stable')
+            else:
+                order = np.argsort(self.texts[name].astype(str), kind='stable')
+            self.orders[name] = order
+        return order
+
+    # -------------------------------------------------------------------------
+    #  sort_rows
+    #  sort row numbers by column
+    #
+    #  argument
+    #    rows       : numpy array of row numbers to be sorted
+    #    name       : column name, None keeps order of 'Master' tab
+    #    descending : True if descending order
+    #
+    #  return
+    #    numpy array of row numbers
+    # -------------------------------------------------------------------------
+    def sort_rows(self, rows: np.ndarray, name: str = None, descending: bool = False) -> np.ndarray:
+        if name is None:
+            return np.sort(rows)
+
+        order = self.get_order(name)
+        if descending:
+            # NaN stays at the end
+            n = len(order)
+            if name in self.numbers:
+                n -= int(np.isnan(self.numbers[name]).sum())
+            order = np.r_[order[:n][::-1], order[n:]]
+
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[rows] = True
+        return order[mask[order]]
+
+    # -------------------------------------------------------------------------
+    #  query
+    #  rows matching query
+    #
+    #  argument
+    #    text : query string, empty string matches all rows
+    #
+    #  return
+    #    numpy bool array of rows, QueryError if query is invalid
+    # -------------------------------------------------------------------------
+    def query(self, text: str) -> np.ndarray:
+        tokens = self.tokenize(text)
+        if len(tokens) == 0:
+            return np.ones(self.num_rows, dtype=bool)
+
+        self.tokens = tokens
+        self.pos = 0
+        mask = self.parse_or()
+        if self.pos < len(tokens):
+            raise QueryError('unexpected \'%s\'' % tokens[self.pos][2])
+        return mask
+
+    def tokenize(self, text: str) -> list:
+        tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            m = self.pattern_token.match(text, pos)
+            if m is None or m.end() == pos:
+                raise QueryError('invalid character at \'%s\'' % text[pos:])
+            pos = m.end()
+            kind = m.lastgroup
+            raw = value = m.group(kind)
+            if kind == 'column':
+                value = self.names[value.lower()]
+            elif kind == 'word' and value.lower() in ('and', 'or', 'not'):
+                kind = value.lower()
+            # (kind, value, text in query)
+            tokens.append((kind, value, raw))
+        return tokens
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None, None
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise QueryError('unexpected end of query')
+        self.pos += 1
+        return token
+
+    def parse_or(self) -> np.ndarray:
+        mask = self.parse_and()
+        while self.peek()[0] == 'or':
+            self.pos += 1
+            mask = mask | self.parse_and()
+        return mask
+
+    def parse_and(self) -> np.ndarray:
+        mask = self.parse_term()
+        while True:
+            kind, value, _ = self.peek()
+            if kind == 'and':
+                self.pos += 1
+            elif kind not in ('not', 'column', 'word', 'quoted') and not (kind == 'paren' and value == '('):
+                break
+            # term without operator is joined by 'and'
+            mask = mask & self.parse_term()
+        return mask
+
+    def parse_term(self) -> np.ndarray:
+        kind, value, _ = self.next()
+        if kind == 'not':
+            return ~self.parse_term()
+        if kind == 'paren' and value == '(':
+            mask = self.parse_or()
+            if self.next()[1] != ')':
+                raise QueryError('\')\' is missing')
+            return mask
+        if kind == 'column':
+            if self.peek()[0] != 'op':
+                # column name alone is searched as word
+                return self.search(self.tokens[self.pos - 1][2])
+            _, op, _ = self.next()
+            # column name may appear as value, e.g. Spec Type = Key
+            operand_kind, _, operand = self.next()
+            if operand_kind in ('paren', 'op'):
+                raise QueryError('value is missing after \'%s %s\'' % (value, op))
+            return self.compare(value, op, operand)
+        if kind in ('word', 'quoted'):
+            return self.search(value)
+        raise QueryError('unexpected \'%s\'' % self.tokens[self.pos - 1][2])
+
+    # -------------------------------------------------------------------------
+    #  search
+    #  rows of which search_columns include word
+    #
+    #  argument
+    #    value : word
+    #
+    #  return
+    #    numpy bool array of rows
+    # -------------------------------------------------------------------------
+    def search(self, value: str) -> np.ndarray:
+        mask = np.zeros(self.num_rows, dtype=bool)
+        for name in self.search_columns:
+            if name in self.columns:
+                mask |= self.compare(name, '~', value)
+        return mask
+
+    # -------------------------------------------------------------------------
+    #  compare
+    #  rows of column compared with value, uses index if available
+    #
+    #  argument
+    #    name  : column name
+    #    op    : operator
+    #    value : operand string
+    #
+    #  return
+    #    numpy bool array of rows
+    # -------------------------------------------------------------------------
+    def compare(self, name: str, op: str, value: str) -> np.ndarray:
+        if self.is_number(name):
+            return self.compare_number(name, op, self.parse_number(name, value))
+        if op in ('<', '<=', '>', '>='):
+            return self.compare_coerced(name, op, self.parse_number(name, value))
+        return self.compare_text(name, op, value.lower())
+
+    @staticmethod
+    def parse_number(name: str, value: str) -> float:
+        try:
+            return float(value.rstrip('%'))
+        except ValueError:
+            raise QueryError('\'%s\' is not a number for \'%s\'' % (value, name))
+
+    def compare_number(self, name: str, op: str, number: float) -> np.ndarray:
+        values = self.numbers[name]
+        order = self.orders.get(name)
+        if order is None or op in ('~', '!='):
+            if op == '~':
+                raise QueryError('\'~\' is not available for number column \'%s\'' % name)
+            with np.errstate(invalid='ignore'):
+                return {
+                    '<': values < number, '<=': values <= number,
+                    '>': values > number, '>=': values >= number,
+                    '=': values == number, '==': values == number,
+                    '!=': values != number,
+                }[op]
+
+        # range of sorted index, NaN at the end is excluded
+        sorted_values = values[order]
+        n = len(order) - int(np.isnan(values).sum())
+        left = np.searchsorted(sorted_values[:n], number, side='left')
+        right = np.searchsorted(sorted_values[:n], number, side='right')
+        start, end = {
+            '<': (0, left), '<=': (0, right),
+            '>': (right, n), '>=': (left, n),
+            '=': (left, right), '==': (left, right),
+        }[op]
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[order[start:end]] = True
+        return mask
+
+    # -------------------------------------------------------------------------
+    #  compare_coerced
+    #  ordering of text column with values converted to number,
+    #  rows not convertible are not matched
+    #
+    #  argument
+    #    name   : column name
+    #    op     : '<', '<=', '>' or '>='
+    #    number : operand
+    #
+    #  return
+    #    numpy bool array of rows
+    # -------------------------------------------------------------------------
+    def compare_coerced(self, name: str, op: str, number: float) -> np.ndarray:
+        values = self.coerced.get(name)
+        if values is None:
+            # empty cell becomes 'nan', converted to NaN
+            values = pd.to_numeric(self.df[name].astype(str).str.rstrip('%'), errors='coerce').to_numpy(dtype=float)
+            self.coerced[name] = values
+
+        # NaN is False for every operator
+        with np.errstate(invalid='ignore'):
+            return {
+                '<': values < number, '<=': values <= number,
+                '>': values > number, '>=': values >= number,
+            }[op]
+
+    def compare_text(self, name: str, op: str, value: str) -> np.ndarray:
+        inverted = self.inverted.get(name)
+        mask = np.zeros(self.num_rows, dtype=bool)
+        if inverted is not None and op in ('=', '==', '!=', '~'):
+            if op == '~':
+                # distinct values are much fewer than rows
+                for key, rows in inverted.items():
+                    if value in key:
+                        mask[rows] = True
+            else:
+                rows = inverted.get(value)
+                if rows is not None:
+                    mask[rows] = True
+                if op == '!=':
+                    mask = ~mask
+            return mask
+
+        texts = self.texts[name]
+        if op == '~':
+            return np.fromiter((value in text for text in texts), dtype=bool, count=len(texts))
+        if op == '!=':
+            return texts != value
+        return texts == value
+
+# ---
+# PROGRAM END
@@ -2,10 +2,161 @@ import pandas as pd
 import numpy as np
 import math
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
 from pptx import Presentation
 from pptx.util import Inches
 from pptx.util import Pt
 
+from cache import SheetCache
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# PartData
+#
+# description
+#   normalized dataframe of PART tab with precomputed 'Data Type' row masks
+class PartData():
+    # data types found in 'Data Type' column
+    data_types = ['Historic', 'Recent', 'Hide']
+
+    def __init__(self, df_all: pd.DataFrame):
+        # all data rows
+        self.df_all: pd.DataFrame = df_all
+
+        # row masks for all data rows
+        data_type = df_all['Data Type'].to_numpy()
+        self.masks_all: dict = {}
+        for type in self.data_types:
+            self.masks_all[type] = data_type == type
+
+        # data rows eliminating 'Hide' and row masks for them
+        visible = ~self.masks_all['Hide']
+        self.df: pd.DataFrame = df_all[visible]
+        self.masks: dict = {}
+        for type in self.data_types:
+            self.masks[type] = self.masks_all[type][visible]
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# LazySheets
+#
+# description
+#   read-only mapping of sheet name -> dataframe, same as the dictionary
+#   returned by pd.read_excel(sheet_name=None), but each sheet is parsed
+#   from the workbook opened in openpyxl read-only (streaming) mode on
+#   the first access
+#
+#   with SheetCache, parsed sheets are stored to the cache and sheets
+#   already cached are loaded from there without opening the workbook,
+#   cache is pruned to its size limit when workbook is closed
+#
+#   sheets can be accessed from several threads, e.g. GUI and loader
+class LazySheets(Mapping):
+    def __init__(self, filename: str, cache: SheetCache = None):
+        self.filename: str = filename
+        self.cache: SheetCache = cache
+        self.key: str = None
+        self.book: pd.ExcelFile = None
+        self.names: list = None
+        self.sheets: dict = {}
+        self.lock = threading.RLock()
+        # True if something has been stored to cache since last prune
+        self.stored: bool = False
+
+        if cache is not None:
+            self.key = cache.get_key(filename)
+            self.names = cache.get_sheet_names(self.key)
+
+        if self.names is None:
+            self.book = pd.ExcelFile(filename, engine='openpyxl')
+            self.names = list(self.book.sheet_names)
+            if cache is not None:
+                try:
+                    cache.put_sheet_names(self.key, filename, self.names)
+                    self.stored = True
+                except OSError as e:
+                    print(e)
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        df = self.sheets.get(name)
+        if df is not None:
+            return df
+        if name not in self.names:
+            raise KeyError(name)
+
+        with self.lock:
+            # parsed by other thread while waiting for lock
+            df = self.sheets.get(name)
+            if df is not None:
+                return df
+
+            index: int = self.names.index(name)
+            if self.cache is not None and self.cache.has_sheet(self.key, index):
+                df = self.cache.get_sheet(self.key, index)
+            else:
+                if self.book is None:
+                    self.book = pd.ExcelFile(self.filename, engine='openpyxl')
+                df = self.book.parse(name)
+                if self.cache is not None:
+                    try:
+                        self.cache.put_sheet(self.key, index, df)
+                        self.stored = True
+                    except OSError as e:
+                        print(e)
+
+            self.sheets[name] = df
+            # workbook is not needed any more when all sheets have been parsed
+            if len(self.sheets) == len(self.names):
+                self.close()
+
+        return df
+
+    def __contains__(self, name) -> bool:
+        # check name only, not to parse sheet
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # -------------------------------------------------------------------------
+    #  is_loaded
+    #
+    #  argument
+    #    name : sheet name
+    #
+    #  return
+    #    True if specified sheet has already been parsed
+    # -------------------------------------------------------------------------
+    def is_loaded(self, name: str) -> bool:
+        return name in self.sheets
+
+    # -------------------------------------------------------------------------
+    #  close
+    #  close workbook file, prune cache if sheets have been stored
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def close(self):
+        with self.lock:
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if self.stored:
+                self.stored = False
+                try:
+                    self.cache.prune()
+                except OSError as e:
+                    print(e)
+
 
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class ExcelSPC():
@@ -14,6 +165,25 @@ class ExcelSPC():
     valid = False
     SL_flag = []
 
+    # cache of PartData, least recently used part is dropped first,
+    # guarded by lock_parts since GUI and worker threads share the instance
+    parts = None
+    lock_parts = None
+    # name_part -> lock held while the tab is parsed, so it is parsed once
+    locks_part = None
+    max_part_cache: int = 32
+
+    # True if sheets are parsed on demand, see LazySheets
+    lazy: bool = False
+
+    # on-disk cache of parsed sheets, not used if None
+    cache: SheetCache = None
+
+    # cache of 'Master' tab, (part, parameter) -> metrics & part -> parameters
+    master = None
+    metrics_index = None
+    param_index = None
+
     header_master = ['Part Number', 'Description', 'Key Parameter', 'Parameter Name',
                      'LSL', 'Target', 'USL', 'Chart Type', 'Metrology', 'Multiple',
                      'Lower Tol', 'Upper Tol', 'Spec Type', 'CL Frozen',
@@ -24,15 +194,33 @@ class ExcelSPC():
                      'Recent Std Dev', 'Cpk for All Points', 'PPM for All Points',
                      'Cpk for Historic & Recent Points', 'PPM for Historic & Recent Points']
 
+    # fields of metrics dictionary returned by get_metrics
+    keys_metrics = ['Part Number', 'Description', 'Key Parameter', 'Parameter Name',
+                    'LSL', 'Target', 'USL', 'Chart Type', 'Metrology', 'Multiple',
+                    'Lower Tol', 'Upper Tol', 'Spec Type', 'CL Frozen',
+                    'LCL', 'Avg', 'UCL', 'RLCL', 'R Avg', 'RUCL', 'CLCR Lower', 'CLCR Upper',
+                    'Total # of Recent Points', '%OOC for Recent Points',
+                    'Cpk for Recent Points', 'PPM for Recent Points',
+                    'Recent Std Dev', 'Cpk for All Points', 'PPM for All Points',
+                    'Cpk for Historic & Recent Points', 'PPM for Historic & Recent Points']
+
     # Regular Expression
     pattern: str = re.compile(r'Unnamed:\s[0-9]+')  # check Unnamed column
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, max_part_cache: int = None, lazy: bool = False, cache: SheetCache = None):
         self.filename: str = filename
-        self.sheets: dict = self.read(filename)
+        if max_part_cache is not None:
+            self.max_part_cache = max_part_cache
+        self.lazy: bool = lazy
+        self.cache: SheetCache = cache
+        self.parts: OrderedDict = OrderedDict()
+        self.lock_parts = threading.RLock()
+        self.locks_part: dict = {}
+        self.sheets: Mapping = self.read(filename)
         self.valid: bool = self.check_valid_sheet(self.sheets)
         if self.valid is False:
             return
+        self.build_metrics_index()
         self.init_SL_flag()
 
     # -------------------------------------------------------------------------
@@ -103,6 +291,7 @@ class ExcelSPC():
         if 'Master' in sheets.keys():
             if len(self.sheets['Master'].columns) == len(self.header_master):
                 self.sheets['Master'].columns = self.header_master
+                self.invalidate_master()
                 return True
             else:
                 # if extra column is Unnamed column, or just empty column, these columns are just accepted
@@ -116,12 +305,29 @@ class ExcelSPC():
                         header_master_new.append(self.sheets['Master'].columns[col])
                     # treat Unnamed column is valid column
                     self.sheets['Master'].columns = header_master_new
+                    self.invalidate_master()
                     return True
 
                 return False
         else:
             return False
 
+    # -------------------------------------------------------------------------
+    #  invalidate_master
+    #  discard cached 'Master' tab and metrics index,
+    #  must be called whenever 'Master' tab is modified
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def invalidate_master(self):
+        self.master = None
+        self.metrics_index = None
+        self.param_index = None
+
     # -------------------------------------------------------------------------
     #  get_master
     #  get dataframe of 'Master' tab
@@ -133,11 +339,45 @@ class ExcelSPC():
     #    pandas dataframe of 'Master' tab
     # -------------------------------------------------------------------------
     def get_master(self) -> pd.DataFrame:
-        df: pd.DataFrame = self.sheets['Master']
-        # drop row if column 'Part Number' is NaN
-        df = df.dropna(subset=['Part Number'])
+        if self.master is None:
+            df: pd.DataFrame = self.sheets['Master']
+            # drop row if column 'Part Number' is NaN
+            self.master = df.dropna(subset=['Part Number'])
 
-        return df
+        return self.master
+
+    # -------------------------------------------------------------------------
+    #  build_metrics_index
+    #  build (Part Number, Parameter Name) -> metrics and
+    #  Part Number -> list of Parameter Name from 'Master' tab
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def build_metrics_index(self):
+        df = self.get_master()
+
+        # column-wise conversion to python objects, once for all rows
+        columns = [df[col].tolist() for col in self.keys_metrics]
+        idx_part = self.keys_metrics.index('Part Number')
+        idx_param = self.keys_metrics.index('Parameter Name')
+
+        metrics_index = {}
+        param_index = {}
+        for values in zip(*columns):
+            name_part = values[idx_part]
+            param = values[idx_param]
+            param_index.setdefault(name_part, []).append(param)
+            # first row wins if same PART/PARAMETER appears more than once
+            key = (name_part, param)
+            if key not in metrics_index:
+                metrics_index[key] = dict(zip(self.keys_metrics, values))
+
+        self.metrics_index = metrics_index
+        self.param_index = param_index
 
     # -------------------------------------------------------------------------
     #  get_metrics
@@ -150,43 +390,29 @@ class ExcelSPC():
     #    dict - metrics dictionary for specified PART and PARAMETER
     # -------------------------------------------------------------------------
     def get_metrics(self, name_part, param):
-        df = self.get_master()
-        df1 = df[(df['Part Number'] == name_part) & (df['Parameter Name'] == param)]
-
-        dict = {}
-        dict['Part Number'] = list(df1['Part Number'])[0]
-        dict['Description'] = list(df1['Description'])[0]
-        dict['Key Parameter'] = list(df1['Key Parameter'])[0]
-        dict['Parameter Name'] = list(df1['Parameter Name'])[0]
-        dict['LSL'] = list(df1['LSL'])[0]
-        dict['Target'] = list(df1['Target'])[0]
-        dict['USL'] = list(df1['USL'])[0]
-        dict['Chart Type'] = list(df1['Chart Type'])[0]
-        dict['Metrology'] = list(df1['Metrology'])[0]
-        dict['Multiple'] = list(df1['Multiple'])[0]
-        dict['Lower Tol'] = list(df1['Lower Tol'])[0]
-        dict['Upper Tol'] = list(df1['Upper Tol'])[0]
-        dict['Spec Type'] = list(df1['Spec Type'])[0]
-        dict['CL Frozen'] = list(df1['CL Frozen'])[0]
-        dict['LCL'] = list(df1['LCL'])[0]
-        dict['Avg'] = list(df1['Avg'])[0]
-        dict['UCL'] = list(df1['UCL'])[0]
-        dict['RLCL'] = list(df1['RLCL'])[0]
-        dict['R Avg'] = list(df1['R Avg'])[0]
-        dict['RUCL'] = list(df1['RUCL'])[0]
-        dict['CLCR Lower'] = list(df1['CLCR Lower'])[0]
-        dict['CLCR Upper'] = list(df1['CLCR Upper'])[0]
-        dict['Total # of Recent Points'] = list(df1['Total # of Recent Points'])[0]
-        dict['%OOC for Recent Points'] = list(df1['%OOC for Recent Points'])[0]
-        dict['Cpk for Recent Points'] = list(df1['Cpk for Recent Points'])[0]
-        dict['PPM for Recent Points'] = list(df1['PPM for Recent Points'])[0]
-        dict['Recent Std Dev'] = list(df1['Recent Std Dev'])[0]
-        dict['Cpk for All Points'] = list(df1['Cpk for All Points'])[0]
-        dict['PPM for All Points'] = list(df1['PPM for All Points'])[0]
-        dict['Cpk for Historic & Recent Points'] = list(df1['Cpk for Historic & Recent Points'])[0]
-        dict['PPM for Historic & Recent Points'] = list(df1['PPM for Historic & Recent Points'])[0]
+        if self.metrics_index is None:
+            self.build_metrics_index()
 
-        return dict
+        # return copy because caller may modify the dictionary
+        return dict(self.metrics_index[(name_part, param)])
+
+    # -------------------------------------------------------------------------
+    #  get_part_param
+    #  get PART No & PARAMETER Name of specified row in 'Master' tab
+    #
+    #  argument
+    #    row : row number of 'Master' tab
+    #
+    #  return
+    #    part  : PART Name
+    #    param : PARAMETER Name
+    # -------------------------------------------------------------------------
+    def get_part_param(self, row: int):
+        df_row: pd.Series = self.get_master().iloc[row]
+        part: str = df_row['Part Number']
+        param: str = df_row['Parameter Name']
+
+        return part, param
 
     # -------------------------------------------------------------------------
     #  get_param_list
@@ -199,9 +425,10 @@ class ExcelSPC():
     #    list of 'Parameter Name' of specified 'Part Number'
     # -------------------------------------------------------------------------
     def get_param_list(self, name_part):
-        df = self.get_master()
+        if self.param_index is None:
+            self.build_metrics_index()
 
-        return list(df[df['Part Number'] == name_part]['Parameter Name'])
+        return list(self.param_index.get(name_part, []))
 
     # -------------------------------------------------------------------------
     #  get_part
@@ -214,12 +441,22 @@ class ExcelSPC():
     #    pandas dataframe of specified name_part tab, eliminating 'Hide'
     # -------------------------------------------------------------------------
     def get_part(self, name_part):
-        df1 = self.get_part_all(name_part)
+        return self.get_part_data(name_part).df
 
-        # eliminate 'Hide' data
-        df2 = df1[df1['Data Type'] != 'Hide']
-
-        return df2
+    # -------------------------------------------------------------------------
+    #  get_series
+    #  get dataframe including data of specified parameter,
+    #  data source interface of Trend (see datasource.py)
+    #
+    #  argument
+    #    name_part  : part name
+    #    name_param : parameter name
+    #
+    #  return
+    #    pandas dataframe of specified name_part tab (without 'Hide')
+    # -------------------------------------------------------------------------
+    def get_series(self, name_part, name_param):
+        return self.get_part(name_part)
 
     # -------------------------------------------------------------------------
     #  get_part
@@ -232,6 +469,88 @@ class ExcelSPC():
     #    pandas dataframe of specified name_part tab (all data)
     # -------------------------------------------------------------------------
     def get_part_all(self, name_part):
+        return self.get_part_data(name_part).df_all
+
+    # -------------------------------------------------------------------------
+    #  get_part_masks
+    #  get 'Data Type' row masks of specified name_part tab
+    #
+    #  argument
+    #    name_part : part name
+    #    hide      : True for rows of get_part, False for rows of get_part_all
+    #
+    #  return
+    #    dict - 'Historic', 'Recent', 'Hide' -> numpy bool array
+    # -------------------------------------------------------------------------
+    def get_part_masks(self, name_part, hide: bool = True) -> dict:
+        part: PartData = self.get_part_data(name_part)
+        if hide:
+            return part.masks
+        else:
+            return part.masks_all
+
+    # -------------------------------------------------------------------------
+    #  get_part_data
+    #  get PartData of specified name_part tab from cache,
+    #  create it if not cached yet, lock_parts is not held while parsing
+    #  and other threads requesting the same tab wait for the result
+    #
+    #  argument
+    #    name_part : part name
+    #
+    #  return
+    #    PartData instance
+    # -------------------------------------------------------------------------
+    def get_part_data(self, name_part) -> PartData:
+        with self.lock_parts:
+            part: PartData = self.parts.get(name_part)
+            if part is not None:
+                self.parts.move_to_end(name_part)
+                return part
+            lock = self.locks_part.setdefault(name_part, threading.Lock())
+
+        with lock:
+            with self.lock_parts:
+                # parsed by other thread while waiting for lock
+                part = self.parts.get(name_part)
+                if part is not None:
+                    self.parts.move_to_end(name_part)
+                    return part
+
+            part = PartData(self.read_part(name_part))
+
+            with self.lock_parts:
+                self.parts[name_part] = part
+                while len(self.parts) > self.max_part_cache:
+                    self.parts.popitem(last=False)
+                self.locks_part.pop(name_part, None)
+
+        return part
+
+    # -------------------------------------------------------------------------
+    #  clear_part_cache
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def clear_part_cache(self):
+        with self.lock_parts:
+            self.parts.clear()
+
+    # -------------------------------------------------------------------------
+    #  read_part
+    #  normalize dataframe of specified name_part tab
+    #
+    #  argument
+    #    name_part : part name
+    #
+    #  return
+    #    pandas dataframe of specified name_part tab (all data)
+    # -------------------------------------------------------------------------
+    def read_part(self, name_part):
         # dataframe of specified name_part tab
         df = self.sheets[name_part]
 
@@ -288,6 +607,33 @@ class ExcelSPC():
 
         return list_part
 
+    # -------------------------------------------------------------------------
+    #  get_part_sheet_names
+    #  get names of tabs for parts listed in 'Master' tab
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    list of tab names
+    # -------------------------------------------------------------------------
+    def get_part_sheet_names(self):
+        return [name_part for name_part in self.get_unique_part_list() if name_part in self.sheets]
+
+    # -------------------------------------------------------------------------
+    #  load_sheet
+    #  make sure that specified tab is parsed, used for lazy mode
+    #
+    #  argument
+    #    name : tab name
+    #
+    #  return
+    #    pandas dataframe of specified tab (as read)
+    # -------------------------------------------------------------------------
+    def load_sheet(self, name):
+        # access to LazySheets parses the tab if not parsed yet
+        return self.sheets[name]
+
     # -------------------------------------------------------------------------
     #  get_header_master
     #  get header list used for making table
@@ -309,9 +655,18 @@ class ExcelSPC():
     #    filename : Excel file
     #
     #  return
-    #    array of pandas dataframe including all Excel sheets
+    #    array of pandas dataframe including all Excel sheets,
+    #    LazySheets instance in lazy mode
     # -------------------------------------------------------------------------
     def read(self, filename):
+        # lazy mode, tabs are parsed when they are accessed first
+        if self.lazy:
+            return LazySheets(filename, self.cache)
+
+        # all tabs at once through cache
+        if self.cache is not None:
+            return dict(LazySheets(filename, self.cache))
+
         # read specified filename as Excel file including all tabs
         # return pd.read_excel(filename, sheet_name=None)
 
@@ -322,6 +677,20 @@ class ExcelSPC():
         )
         return df
 
+    # -------------------------------------------------------------------------
+    #  close
+    #  release Excel file kept open in lazy mode
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def close(self):
+        if isinstance(self.sheets, LazySheets):
+            self.sheets.close()
+
 
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class PowerPoint():
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# coding: utf-8
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import SheetCache
+from office import ExcelSPC
+from trend import Trend
+
+# ExcelSPC instance owned by worker process, see init_worker
+worker_sheets: ExcelSPC = None
+
+
+# image formats supported by both matplotlib and python-pptx
+image_formats = ['png', 'jpg', 'tiff']
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# ChartImage
+#
+# description
+#   rendered SPC chart of one row of 'Master' tab
+class ChartImage():
+    def __init__(self, row: int, part: str, param: str):
+        self.row: int = row
+        self.part: str = part
+        self.param: str = param
+        # encoded image and its format
+        self.image: bytes = None
+        self.format: str = None
+        # 'Date of Last Lot Received'
+        self.date_last: str = 'n/a'
+        # error message of Trend, None if no error
+        self.error: str = None
+
+
+# -----------------------------------------------------------------------------
+#  format_last_date
+#
+#  argument
+#    dateObj : latest date of the data, obtained by Trend.get_last_date
+#
+#  return
+#    str - date string for PowerPoint slide
+# -----------------------------------------------------------------------------
+def format_last_date(dateObj) -> str:
+    if dateObj is None:
+        return 'n/a'
+    elif type(dateObj) is float:
+        if math.isnan(dateObj):
+            return 'n/a'
+        else:
+            return str(dateObj)
+    elif type(dateObj) is str:
+        return dateObj
+    else:
+        return dateObj.strftime('%m/%d/%Y')
+
+
+# -----------------------------------------------------------------------------
+#  render_chart
+#  render SPC chart of specified row into image in memory
+#
+#  argument
+#    sheets : ExcelSPC instance
+#    row    : row number of 'Master' tab
+#    format : image format, one of image_formats
+#    dpi    : resolution of image, resolution of figure if None
+#
+#  return
+#    ChartImage instance
+# -----------------------------------------------------------------------------
+def render_chart(sheets: ExcelSPC, row: int, format: str = 'png', dpi: int = None) -> ChartImage:
+    part, param = sheets.get_part_param(row)
+    chart = ChartImage(row, part, param)
+
+    info = {
+        'PART': part,
+        'PARAM': param,
+    }
+    trend = Trend(sheets, row)
+    figure = trend.get(info)
+    chart.error = trend.get_error()
+    chart.date_last = format_last_date(trend.get_last_date())
+
+    buf = io.BytesIO()
+    if dpi is None:
+        figure.savefig(buf, format=format)
+    else:
+        figure.savefig(buf, format=format, dpi=dpi)
+    chart.image = buf.getvalue()
+    chart.format = format
+
+    return chart
+
+
+# -----------------------------------------------------------------------------
+#  init_worker
+#  open Excel file in worker process
+#
+#  argument
+#    filename      : Excel file
+#    dirname_cache : directory of SheetCache, None if cache is not used
+#
+#  return
+#    (none)
+# -----------------------------------------------------------------------------
+def init_worker(filename: str, dirname_cache: str):
+    global worker_sheets
+
+    if dirname_cache is None:
+        cache = None
+    else:
+        cache = SheetCache(dirname_cache)
+
+    # only tabs of assigned rows are parsed
+    worker_sheets = ExcelSPC(filename, lazy=True, cache=cache)
+
+
+# -----------------------------------------------------------------------------
+#  run_job
+#  render chart in worker process
+#
+#  argument
+#    job : (row, Spec Limit flag of the row, image format, dpi)
+#
+#  return
+#    ChartImage instance
+# -----------------------------------------------------------------------------
+def run_job(job: tuple) -> ChartImage:
+    row, flag, format, dpi = job
+    worker_sheets.set_SL_flag(row, flag)
+
+    return render_chart(worker_sheets, row, format, dpi)
+
+
+# -----------------------------------------------------------------------------
+#  render_charts
+#  render SPC charts of specified rows with process pool
+#
+#  argument
+#    sheets : ExcelSPC instance
+#    rows   : row numbers of 'Master' tab
+#    jobs   : number of worker processes, number of CPUs if None,
+#             rendered in this process if 1
+#    format : image format, one of image_formats
+#    dpi    : resolution of image, resolution of figure if None
+#
+#  return
+#    iterator of ChartImage instances in order of rows
+# -----------------------------------------------------------------------------
+def render_charts(sheets: ExcelSPC, rows, jobs: int = None, format: str = 'png', dpi: int = None):
+    list_job = [(row, sheets.get_SL_flag(row), format, dpi) for row in rows]
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(list_job))
+
+    if jobs <= 1:
+        for row, flag, format, dpi in list_job:
+            yield render_chart(sheets, row, format, dpi)
+        return
+
+    if sheets.cache is None:
+        dirname_cache = None
+    else:
+        dirname_cache = sheets.cache.dirname
+
+    # consecutive rows usually belong to the same PART,
+    # so chunk of rows is passed to worker not to parse the same tab in many workers
+    chunksize = max(1, len(list_job) // (jobs * 4))
+
+    with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(sheets.get_filename(), dirname_cache),
+    ) as executor:
+        for chart in executor.map(run_job, list_job, chunksize=chunksize):
+            yield chart
+
+# ---
+# PROGRAM END
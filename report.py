@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# headless PowerPoint report generator, no Qt is required
+#
+# usage
+#   python report.py in.xlsm -o out.pptx [--parts PART ...] [--jobs N]
+#   python spc_master.py report in.xlsm -o out.pptx ...
+import argparse
+import io
+import os
+import sys
+import time
+
+from cache import SheetCache
+from office import ExcelSPC, PowerPoint
+from render import image_formats, render_charts
+
+# default PowerPoint template, relative to this file not to current directory
+template_default: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template', 'template.pptx')
+
+
+# -----------------------------------------------------------------------------
+#  get_rows
+#  row numbers of 'Master' tab for specified parts
+#
+#  argument
+#    sheets : ExcelSPC instance
+#    parts  : list of 'Part Number', all parts if empty
+#
+#  return
+#    list of row numbers
+# -----------------------------------------------------------------------------
+def get_rows(sheets: ExcelSPC, parts: list) -> list:
+    list_part = sheets.get_master()['Part Number'].tolist()
+    if not parts:
+        return list(range(len(list_part)))
+
+    set_part = set(parts)
+    return [row for row, part in enumerate(list_part) if part in set_part]
+
+
+# -----------------------------------------------------------------------------
+#  create_report
+#  create PowerPoint file with SPC charts
+#
+#  argument
+#    sheets    : ExcelSPC instance
+#    rows      : row numbers of 'Master' tab, one slide per row
+#    template  : PowerPoint template
+#    save_path : PowerPoint file to create
+#    jobs      : number of worker processes to render charts
+#    format    : image format of charts
+#    dpi       : resolution of charts
+#
+#  return
+#    number of charts with error
+# -----------------------------------------------------------------------------
+def create_report(sheets: ExcelSPC, rows: list, template: str, save_path: str,
+                  jobs: int = None, format: str = 'png', dpi: int = None) -> int:
+    ppt_obj = PowerPoint(template)
+
+    n_error = 0
+    for chart in render_charts(sheets, rows, jobs, format, dpi):
+        if chart.error is not None:
+            print(chart.error, file=sys.stderr)
+            n_error += 1
+
+        info = {
+            'PART': chart.part,
+            'PARAM': chart.param,
+            'IMAGE': io.BytesIO(chart.image),
+            'Date of Last Lot Received': chart.date_last,
+        }
+        ppt_obj.add_slide(sheets, info)
+
+    ppt_obj.save(save_path)
+
+    return n_error
+
+
+# =============================================================================
+#  MAIN
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='create PowerPoint report of SPC charts from Excel macro file')
+    parser.add_argument('excel', help='Excel macro file for SPC')
+    parser.add_argument('-o', '--output', default=None, help='PowerPoint file to create (default: EXCEL with .pptx)')
+    parser.add_argument('--parts', nargs='+', default=[], help='Part Number(s) to report (default: all)')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--template', default=template_default, help='PowerPoint template (default: %(default)s)')
+    parser.add_argument('--format', choices=image_formats, default='png', help='image format of charts')
+    parser.add_argument('--dpi', type=int, default=None, help='resolution of charts (default: as figure)')
+    parser.add_argument('--hide-spec-limits', action='store_true', help='hide Spec Limit(s) on charts')
+    parser.add_argument('--cache-dir', default=None, help='cache directory (default: %s)' % SheetCache.dirname)
+    parser.add_argument('--no-cache', action='store_true', help='do not use cache of parsed Excel file')
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.template):
+        parser.error('PowerPoint template not found: ' + args.template)
+
+    if args.output is None:
+        save_path = os.path.splitext(args.excel)[0] + '.pptx'
+    else:
+        save_path = args.output
+
+    if args.no_cache:
+        cache = None
+    else:
+        cache = SheetCache(args.cache_dir)
+
+    time_start = time.perf_counter()
+
+    sheets = ExcelSPC(args.excel, lazy=True, cache=cache)
+    if sheets.valid is not True:
+        print(args.excel + ': Not appropriate format!', file=sys.stderr)
+        return 1
+
+    rows = get_rows(sheets, args.parts)
+    if len(rows) == 0:
+        print(args.excel + ': no parameter to report', file=sys.stderr)
+        return 1
+
+    if args.hide_spec_limits:
+        for row in rows:
+            sheets.set_SL_flag(row, True)
+
+    n_error = create_report(sheets, rows, args.template, save_path, args.jobs, args.format, args.dpi)
+    sheets.close()
+
+    print('%s: %d slide(s), %d error(s), %.1f sec' % (
+        save_path, len(rows), n_error, time.perf_counter() - time_start))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+# ---
+#  END OF PROGRAM
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# coding: utf-8
+#
+# schema of SPC database, versioned by PRAGMA user_version
+#
+# each migration is applied once in one transaction, in order of version,
+# migration function takes connection and list to append warnings to
+import sqlite3
+
+# (table, index, columns) of indexes used by lookups of SqlDB / db_import
+#   unique index is created if possible, plain index if existing rows
+#   violate uniqueness
+indexes = [
+    ('part', 'idx_part_supplier_num', ['id_supplier', 'num_part']),
+    ('param', 'idx_param_supplier_part_name', ['id_supplier', 'id_part', 'name_param']),
+    # timestamp first, also used by range scan of ImportSession
+    ('batch', 'idx_batch_timestamp_sample_serial', ['timestamp', 'sample', 'serial']),
+    ('measure', 'idx_measure_param_batch', ['id_param', 'id_batch']),
+]
+
+
+# -----------------------------------------------------------------------------
+#  create_tables - migration to version 1
+# -----------------------------------------------------------------------------
+def create_tables(con: sqlite3.Connection, warnings: list):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS supplier (
+            id_supplier INTEGER PRIMARY KEY AUTOINCREMENT,
+            name_supplier TEXT,
+            name_supplier_short TEXT
+        );
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS part (
+            id_part INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_supplier INTEGER,
+            num_part TEXT
+        );
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS param (
+            id_param INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_supplier INTEGER,
+            id_part INTEGER,
+            num_part_excel TEXT,
+            name_param TEXT,
+            num_key TEXT,
+            lsl REAL,
+            target REAL,
+            usl REAL,
+            charttype TEXT,
+            metrology TEXT,
+            multiple TEXT,
+            spectype TEXT,
+            frozen TEXT,
+            lcl REAL,
+            mean REAL,
+            ucl REAL
+        );
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS batch (
+            id_batch INTEGER PRIMARY KEY AUTOINCREMENT,
+            sample INTEGER,
+            timestamp INTEGER,
+            id_lot TEXT,
+            serial TEXT
+        );
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS measure (
+            id_measure INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_param INTEGER,
+            id_batch INTEGER,
+            value REAL
+        );
+    """)
+
+
+# -----------------------------------------------------------------------------
+#  create_indexes - migration to version 2
+#  plain index created instead of unique one is reported in warnings
+# -----------------------------------------------------------------------------
+def create_indexes(con: sqlite3.Connection, warnings: list):
+    for table, name, columns in indexes:
+        sql = 'CREATE %%s INDEX IF NOT EXISTS %s ON %s (%s);' % (name, table, ', '.join(columns))
+        con.execute('SAVEPOINT idx;')
+        try:
+            con.execute(sql % 'UNIQUE')
+        except sqlite3.IntegrityError as e:
+            # duplicated rows exist already
+            warnings.append('%s is not unique, duplicated rows in %s table (%s)' % (name, table, e))
+            con.execute('ROLLBACK TO idx;')
+            con.execute(sql % '')
+        con.execute('RELEASE idx;')
+
+    con.execute('ANALYZE;')
+
+
+# -----------------------------------------------------------------------------
+#  create_import_state - migration to version 3
+#  content hash and high-water mark of (timestamp, sample) per part tab
+# -----------------------------------------------------------------------------
+def create_import_state(con: sqlite3.Connection, warnings: list):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS import_state (
+            id_supplier INTEGER,
+            num_part_excel TEXT,
+            hash TEXT,
+            timestamp INTEGER,
+            sample INTEGER,
+            PRIMARY KEY (id_supplier, num_part_excel)
+        );
+    """)
+
+
+# migrations in order of version, index + 1 is version after migration
+migrations = [
+    create_tables,
+    create_indexes,
+    create_import_state,
+]
+
+
+# -----------------------------------------------------------------------------
+#  get_version
+#
+#  argument
+#    con : sqlite3.Connection
+#
+#  return
+#    schema version of database
+# -----------------------------------------------------------------------------
+def get_version(con: sqlite3.Connection) -> int:
+    return con.execute('PRAGMA user_version;').fetchone()[0]
+
+
+# -----------------------------------------------------------------------------
+#  needs_migration
+#
+#  argument
+#    con : sqlite3.Connection
+#
+#  return
+#    True if migrations not applied yet exist
+# -----------------------------------------------------------------------------
+def needs_migration(con: sqlite3.Connection) -> bool:
+    return get_version(con) < len(migrations)
+
+
+# -----------------------------------------------------------------------------
+#  migrate
+#  apply migrations not applied yet
+#
+#  argument
+#    con      : sqlite3.Connection in autocommit mode
+#    progress : callback(version, version of latest schema) called before
+#               each migration, None if not used
+#    warnings : list to append warning messages to, None if not used
+#
+#  return
+#    schema version of database
+# -----------------------------------------------------------------------------
+def migrate(con: sqlite3.Connection, progress=None, warnings: list = None) -> int:
+    if warnings is None:
+        warnings = []
+    version = get_version(con)
+
+    for version_new in range(version + 1, len(migrations) + 1):
+        if progress is not None:
+            progress(version_new, len(migrations))
+        con.execute('BEGIN IMMEDIATE;')
+        try:
+            migrations[version_new - 1](con, warnings)
+            # PRAGMA does not accept bound parameter
+            con.execute('PRAGMA user_version = %d;' % version_new)
+        except BaseException:
+            con.execute('ROLLBACK;')
+            raise
+        con.execute('COMMIT;')
+        version = version_new
+
+    return version
+
@@ -4,29 +4,81 @@
 import configparser
 import os.path
 import sys
-from PySide2.QtCore import Slot
+from PySide2.QtCore import QThread, Signal, Slot
 from PySide2.QtGui import QIcon
 from PySide2.QtWidgets import (
     QApplication,
     QFileDialog,
     QHeaderView,
+    QLineEdit,
     QMainWindow,
     QMessageBox,
+    QProgressBar,
     QStatusBar,
     QSizePolicy,
     QTabWidget,
     QToolBar,
     QToolButton,
+    QVBoxLayout,
     QWidget,
 )
+from cache import SheetCache
 from database import SqlDB
-from db_manager import DBManWin
+from db_manager import DBManWin, MigrateWorker
+from master_filter import QueryError
 from office import ExcelSPC
 from resource import Icons
 from spc_chart import ChartWin
 from worksheet import SheetMaster
 
 
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# ExcelLoader
+#
+# description
+#   worker thread to read Excel macro file,
+#   'Master' tab is notified first, then part tabs are parsed one by one
+class ExcelLoader(QThread):
+    # ExcelSPC instance, 'Master' tab is available
+    masterReady = Signal(object)
+    # number of parsed part tabs, number of part tabs, name of tab
+    progress = Signal(int, int, str)
+    # error message
+    failed = Signal(str)
+
+    # True if stopped by requestInterruption
+    cancelled: bool = False
+
+    def __init__(self, parent: QMainWindow, filename: str, cache: SheetCache):
+        super().__init__(parent=parent)
+        self.filename: str = filename
+        self.cache: SheetCache = cache
+
+    def run(self):
+        try:
+            sheets: ExcelSPC = ExcelSPC(self.filename, lazy=True, cache=self.cache)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        self.masterReady.emit(sheets)
+        if sheets.valid is not True:
+            return
+
+        list_name: list = sheets.get_part_sheet_names()
+        n: int = len(list_name)
+        for i, name in enumerate(list_name):
+            if self.isInterruptionRequested():
+                self.cancelled = True
+                return
+            try:
+                sheets.load_sheet(name)
+            except Exception as e:
+                self.failed.emit(name + ': ' + str(e))
+                return
+            self.progress.emit(i + 1, n, name)
+
+
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class SPCMaster(QMainWindow):
     # Application information
@@ -45,6 +97,11 @@ class SPCMaster(QMainWindow):
     sheets: ExcelSPC = None
     chart = None
     db = None
+    cache: SheetCache = None
+    loader: ExcelLoader = None
+    migrator: MigrateWorker = None
+    # quit when loaders / migration in background have stopped
+    flag_quit: bool = False
 
     # Initial path to read Excel file
     path_excel = os.path.expanduser('~/')
@@ -64,11 +121,13 @@ class SPCMaster(QMainWindow):
         self.config = configparser.ConfigParser()
         self.config.read(self.confFile, 'UTF-8')
         self.initDB()
+        self.initCache()
 
         self.initUI()
         self.setWindowIcon(QIcon(self.icons.LOGO))
         self.setAppTitle()
         self.setGeometry(self.x_init, self.y_init, self.w_init, self.h_init)
+        self.migrateDB()
 
     # -------------------------------------------------------------------------
     #  initDB
@@ -86,14 +145,124 @@ class SPCMaster(QMainWindow):
             print('Empty!')
             pass
         elif os.path.exists(dbname):
-            # make SqlDB instance
-            self.db = SqlDB(dbname)
+            # make SqlDB instance, schema is migrated in background by migrateDB
+            self.db = SqlDB(dbname, migrate=False)
         else:
             # delete dbname in config file
             self.config.set('Database', 'DBNAME', '')
             with open(self.confFile, 'w') as file:
                 self.config.write(file)
 
+    # -------------------------------------------------------------------------
+    #  migrateDB
+    #  migrate schema of database in background if not migrated yet,
+    #  DB Manager is disabled until it is done
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def migrateDB(self):
+        if self.db is None:
+            return
+        if not self.db.needs_migration():
+            self.db.init_schema()
+            return
+
+        self.migrator = MigrateWorker(self, self.db)
+        self.migrator.progress.connect(self.handleMigrateProgress)
+        self.migrator.migrated.connect(self.handleMigrated)
+        self.migrator.failed.connect(self.handleMigrateFailed)
+        self.migrator.finished.connect(self.handleMigrateFinished)
+
+        self.tool_db.setEnabled(False)
+        self.statusbar.showMessage('Migrating database schema ...')
+
+        self.migrator.start()
+
+    # -------------------------------------------------------------------------
+    #  handleMigrateProgress
+    #
+    #  argument
+    #    version : version being migrated to
+    #    n       : version of latest schema
+    #    message : progress message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(int, int, str)
+    def handleMigrateProgress(self, version: int, n: int, message: str):
+        self.statusbar.showMessage(message)
+
+    # -------------------------------------------------------------------------
+    #  handleMigrated
+    #
+    #  argument
+    #    warnings : warnings of migration, e.g. unique index not created
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(list)
+    def handleMigrated(self, warnings: list):
+        self.statusbar.showMessage('Database schema migrated')
+        if len(warnings) > 0:
+            QMessageBox.warning(self, 'Database', '\n'.join(warnings))
+
+    # -------------------------------------------------------------------------
+    #  handleMigrateFailed
+    #
+    #  argument
+    #    msg : error message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(str)
+    def handleMigrateFailed(self, msg: str):
+        QMessageBox.critical(self, 'Error', msg)
+
+    # -------------------------------------------------------------------------
+    #  handleMigrateFinished
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def handleMigrateFinished(self):
+        if self.flag_quit:
+            self.quitApp()
+            return
+
+        self.tool_db.setEnabled(True)
+
+    # -------------------------------------------------------------------------
+    #  initCache
+    #  cache of parsed Excel sheets
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def initCache(self):
+        # Config for Cache, empty dirname for default directory
+        dirname = self.config.get('Cache', 'DIRNAME', fallback='')
+        maxsize = self.config.getint('Cache', 'MAXSIZE', fallback=0)
+
+        if maxsize > 0:
+            # size limit in MB
+            self.cache = SheetCache(dirname, maxsize * 1024 ** 2)
+        else:
+            self.cache = SheetCache(dirname)
+
     # -------------------------------------------------------------------------
     #  initUI
     #  UI initialization
@@ -123,11 +292,11 @@ class SPCMaster(QMainWindow):
         toolbar.addWidget(spacer)
 
         # Add Excel read buttons to toolbar
-        tool_db: QToolButton = QToolButton()
-        tool_db.setIcon(QIcon(self.icons.DB))
-        tool_db.setStatusTip('DB setting')
-        tool_db.clicked.connect(self.dbMan)
-        toolbar.addWidget(tool_db)
+        self.tool_db: QToolButton = QToolButton()
+        self.tool_db.setIcon(QIcon(self.icons.DB))
+        self.tool_db.setStatusTip('DB setting')
+        self.tool_db.clicked.connect(self.dbMan)
+        toolbar.addWidget(self.tool_db)
 
         # Add Excel read buttons to toolbar
         tool_exit: QToolButton = QToolButton()
@@ -146,6 +315,19 @@ class SPCMaster(QMainWindow):
         self.statusbar: QStatusBar = QStatusBar()
         self.setStatusBar(self.statusbar)
 
+        # progress of reading Excel file, shown while loading
+        self.progressbar: QProgressBar = QProgressBar()
+        self.progressbar.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.progressbar.hide()
+        self.statusbar.addPermanentWidget(self.progressbar)
+
+        self.tool_cancel: QToolButton = QToolButton()
+        self.tool_cancel.setIcon(QIcon(self.icons.CLOSE))
+        self.tool_cancel.setStatusTip('Cancel reading Excel file')
+        self.tool_cancel.clicked.connect(self.cancelLoad)
+        self.tool_cancel.hide()
+        self.statusbar.addPermanentWidget(self.tool_cancel)
+
         self.show()
 
     # -------------------------------------------------------------------------
@@ -206,15 +388,51 @@ class SPCMaster(QMainWindow):
         header_row: QHeaderView = self.sheet_master.verticalHeader()
         header_row.sectionDoubleClicked.connect(self.handleRowHeaderDblClick)
 
+        # filter of Master sheet
+        search_master: QLineEdit = QLineEdit()
+        search_master.setPlaceholderText('Filter, e.g. Cpk < 1.33 and Recent OOC > 0')
+        search_master.setClearButtonEnabled(True)
+        search_master.textChanged.connect(self.handleMasterQuery)
+
+        tab_master: QWidget = QWidget()
+        layout: QVBoxLayout = QVBoxLayout(tab_master)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(search_master)
+        layout.addWidget(self.sheet_master)
+
         # add Master sheet to Tab widget
-        self.tabwidget.addTab(self.sheet_master, icon_master, 'Master')
+        self.tabwidget.addTab(tab_master, icon_master, 'Master')
+
+    # -------------------------------------------------------------------------
+    #  handleMasterQuery
+    #  filter rows of Master sheet
+    #
+    #  argument
+    #    text : query string
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def handleMasterQuery(self, text: str):
+        try:
+            n = self.sheet_master.set_query(text)
+        except QueryError as e:
+            # previous filter is kept while typing
+            self.statusbar.showMessage(str(e))
+            return
+
+        if len(text.strip()) == 0:
+            self.statusbar.clearMessage()
+        else:
+            self.statusbar.showMessage('%d / %d rows' % (n, self.num_param))
 
     # -------------------------------------------------------------------------
     #  handleRowHeaderDblClick
     #  Handle event when double clicked row header
     #
     #  argument
-    #    row : row number where is clicked
+    #    row : row number where is clicked, row of sorted / filtered view
     #
     #  return
     #    (none)
@@ -225,20 +443,21 @@ class SPCMaster(QMainWindow):
             self.chart.close()
             self.chart.deleteLater()
 
-        self.chart = ChartWin(self, self.sheets, self.num_param, row)
+        # ChartWin handles row of 'Master' tab
+        self.chart = ChartWin(self, self.sheets, self.num_param, self.sheet_master.get_source_row(row))
 
     # -------------------------------------------------------------------------
     #  setRowSelect
     #  Set row selection
     #
     #  argument
-    #    row : row to be selected
+    #    row : row of 'Master' tab to be selected
     #
     #  return
     #    (none)
     # -------------------------------------------------------------------------
     def setMasterRowSelect(self, row: int):
-        self.sheet_master.selectRow(row)
+        self.sheet_master.select_source_row(row)
 
     # -------------------------------------------------------------------------
     #  openFile
@@ -262,24 +481,169 @@ class SPCMaster(QMainWindow):
 
         # read selected file
         filename: str = dialog.selectedFiles()[0]
-        if self.sheets is not None:
-            del self.sheets
-        self.sheets: ExcelSPC = ExcelSPC(filename)
         # update path to open
         self.path_excel = os.path.dirname(filename)
 
+        # stop reading previous file if it is still being read
+        self.cancelLoad()
+
+        # read file in background, part tabs are parsed after 'Master' tab
+        self.loader = ExcelLoader(self, filename, self.cache)
+        self.loader.masterReady.connect(self.handleMasterReady)
+        self.loader.progress.connect(self.handleLoadProgress)
+        self.loader.failed.connect(self.handleLoadFailed)
+        self.loader.finished.connect(self.handleLoadFinished)
+        self.loader.finished.connect(self.loader.deleteLater)
+
+        self.statusbar.showMessage('Reading ' + os.path.basename(filename) + ' ...')
+        self.progressbar.setRange(0, 0)
+        self.progressbar.show()
+        self.tool_cancel.show()
+
+        self.loader.start()
+
+    # -------------------------------------------------------------------------
+    #  handleMasterReady
+    #  'Master' tab of Excel file has been parsed
+    #
+    #  argument
+    #    sheets : ExcelSPC instance
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(object)
+    def handleMasterReady(self, sheets: ExcelSPC):
+        # notification from cancelled loader
+        if self.sender() is not self.loader:
+            sheets.close()
+            return
+
         # check if sheets have valid format or not
-        if self.sheets.valid is not True:
+        if sheets.valid is not True:
+            sheets.close()
             QMessageBox.critical(self, 'Error', 'Not appropriate format!')
-            self.sheets = None
             return
 
+        if self.sheets is not None:
+            self.sheets.close()
+            del self.sheets
+        self.sheets: ExcelSPC = sheets
+
         # update application title
-        self.setAppTitle(filename)
+        self.setAppTitle(sheets.get_filename())
 
         # create new tab
         self.createTabs()
 
+    # -------------------------------------------------------------------------
+    #  handleLoadProgress
+    #  part tab has been parsed
+    #
+    #  argument
+    #    i    : number of parsed part tabs
+    #    n    : number of part tabs
+    #    name : name of parsed tab
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(int, int, str)
+    def handleLoadProgress(self, i: int, n: int, name: str):
+        if self.sender() is not self.loader:
+            return
+
+        self.progressbar.setRange(0, n)
+        self.progressbar.setValue(i)
+        self.statusbar.showMessage('Read ' + name + ' (' + str(i) + '/' + str(n) + ')')
+
+    # -------------------------------------------------------------------------
+    #  handleLoadFailed
+    #
+    #  argument
+    #    msg : error message
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot(str)
+    def handleLoadFailed(self, msg: str):
+        # notification from cancelled loader
+        if self.sender() is not self.loader:
+            return
+
+        QMessageBox.critical(self, 'Error', msg)
+
+    # -------------------------------------------------------------------------
+    #  handleLoadFinished
+    #  reading Excel file has been completed or cancelled
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def handleLoadFinished(self):
+        if self.flag_quit:
+            self.quitApp()
+            return
+
+        if self.sender() is not self.loader:
+            return
+
+        self.progressbar.hide()
+        self.tool_cancel.hide()
+        if self.loader.cancelled:
+            self.statusbar.showMessage('Reading cancelled, rest of tabs are read on demand')
+        else:
+            self.statusbar.clearMessage()
+        # deleted later
+        self.loader = None
+
+    # -------------------------------------------------------------------------
+    #  cancelLoad
+    #  cancel reading part tabs in background, loader stops after the tab
+    #  being parsed and the end is handled by handleLoadFinished
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    @Slot()
+    def cancelLoad(self):
+        if self.loader is None or not self.loader.isRunning():
+            return
+
+        self.loader.requestInterruption()
+        self.tool_cancel.hide()
+        self.statusbar.showMessage('Cancelling ...')
+
+    # -------------------------------------------------------------------------
+    #  quitApp
+    #  quit application, deferred until loaders and migration in background
+    #  have stopped
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def quitApp(self):
+        self.cancelLoad()
+        threads = self.findChildren(ExcelLoader) + self.findChildren(MigrateWorker)
+        if any(thread.isRunning() for thread in threads):
+            # called again by handleLoadFinished / handleMigrateFinished
+            self.flag_quit = True
+            self.hide()
+            return
+
+        QApplication.quit()
+
     # -------------------------------------------------------------------------
     #  dbMan
     #  database manager
@@ -317,19 +681,23 @@ class SPCMaster(QMainWindow):
         if sender is not None:
             # Exit button is clicked
             if reply == QMessageBox.Yes:
-                QApplication.quit()
+                self.quitApp()
         else:
             # x on the window is clicked
+            event.ignore()
             if reply == QMessageBox.Yes:
-                event.accept()
-            else:
-                event.ignore()
+                self.quitApp()
 
 
 # =============================================================================
 #  MAIN
 # =============================================================================
 def main():
+    # headless report generation, see report.py
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        import report
+        sys.exit(report.main(sys.argv[2:]))
+
     app: QApplication = QApplication(sys.argv)
     ex: SPCMaster = SPCMaster()
     sys.exit(app.exec_())
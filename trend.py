@@ -0,0 +1,1104 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import datetime
+import threading
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+import re
+
+from office import ExcelSPC
+
+# classification flags of data points, see classify
+CLASS_HISTORIC: int = 1
+CLASS_RECENT: int = 2
+CLASS_OOC: int = 4  # Recent point out of Control Limit(s)
+CLASS_OOS: int = 8  # Recent point out of Spec Limit(s)
+
+
+# -----------------------------------------------------------------------------
+#  classify
+#  classify data points of one parameter in one vectorized pass
+#
+#  argument
+#    df         : data rows including 'Data Type' and name_param columns
+#    metrics    : metrics dictionary of 'Master' tab
+#    name_param : parameter name
+#    flag_no_CL : True if Control Limit(s) are not applied
+#
+#  return
+#    numpy uint8 array of CLASS_* flags aligned to rows of df,
+#    CLASS_OOC / CLASS_OOS are combined with CLASS_RECENT
+# -----------------------------------------------------------------------------
+def classify(df: pd.DataFrame, metrics: dict, name_param: str, flag_no_CL: bool = False) -> np.ndarray:
+    data_type = df['Data Type'].to_numpy()
+    classes = np.zeros(len(df), dtype=np.uint8)
+    classes[data_type == 'Historic'] = CLASS_HISTORIC
+    recent = data_type == 'Recent'
+    classes[recent] = CLASS_RECENT
+
+    spec_type = metrics['Spec Type']
+    if spec_type not in ('Two-Sided', 'One-Sided'):
+        return classes
+
+    # NaN of value or limit is never out of limit
+    value = pd.to_numeric(df[name_param], errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        ooc = value > metrics['UCL']
+        oos = value > metrics['USL']
+        if spec_type == 'Two-Sided':
+            ooc |= value < metrics['LCL']
+            oos |= value < metrics['LSL']
+
+    if not flag_no_CL:
+        classes[ooc & recent] |= CLASS_OOC
+    classes[oos & recent] |= CLASS_OOS
+
+    return classes
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# TrendStyle
+#
+# description
+#   appearance of SPC chart, passed to Trend explicitly instead of
+#   modifying matplotlib.rcParams
+class TrendStyle():
+    # figure size (inch) and resolution
+    figsize: tuple = (10, 3.5)
+    dpi: int = 100
+
+    # plot margin
+    margin_plot_left: float = 0.17
+    margin_plot_right: float = 0.83
+
+    # font family to display
+    font_family: str = 'monospace'
+
+    # tick color
+    color_tick: str = '#c0c0c0'
+
+    # circle size of OOC, OOS
+    size_point: int = 10
+    size_oos_out: int = 100
+    size_oos_in: int = 50
+    size_ooc_out: int = 80
+    size_ooc_in: int = 40
+
+    # color of OOC, OOS
+    color_ooc_out: str = 'red'
+    color_ooc_in: str = 'white'
+    color_oos_out: str = 'red'
+    color_oos_in: str = 'white'
+
+    # color of metrics
+    SL: str = 'blue'
+    CL: str = 'red'
+    RCL: str = 'black'
+    TG: str = 'purple'
+    AVG: str = 'green'
+
+    def __init__(self, **kwargs):
+        # override default value, e.g. TrendStyle(dpi=150)
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise AttributeError('unknown style: ' + key)
+            setattr(self, key, value)
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# TrendData
+#
+# description
+#   data to draw SPC chart of one parameter, prepared by Trend.prepare
+class TrendData():
+    def __init__(self, part: str, param: str):
+        self.part: str = part
+        self.param: str = param
+        # metrics dictionary of 'Master' tab
+        self.metrics: dict = None
+        # data rows of PART tab, eliminating 'Hide'
+        self.df: pd.DataFrame = None
+        # x (Sample) and y (value of parameter), NaN of y is replaced by zero
+        self.x: pd.Series = None
+        self.y: pd.Series = None
+        # latest date of the data
+        self.date_last = None
+        # True if Spec Limit(s) are hidden
+        self.flag_SL: bool = False
+        # True if Control Limit(s) are not drawn (parameter name with _Max/_Min)
+        self.flag_no_CL: bool = False
+        # CLASS_* flags of data points, aligned to rows of df
+        self.classes: np.ndarray = None
+        # error message if chart could not be drawn, otherwise None
+        self.error: str = None
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# Trend
+#
+# description
+#   SPC chart without pyplot, rcParams and GUI, so that charts can be
+#   rendered in any thread or process at the same time
+class Trend():
+    # initial value of instances
+    # data source, ExcelSPC or datasource.SqlSource
+    sheets = None
+    row: int = 0
+    style: TrendStyle = None
+    data: TrendData = None
+    fig = None
+    ax1 = None
+    ax2 = None
+
+    # artists of last chart to be updated in place by update, see redraw
+    #   hlines  : axhline of get_hlines in same order
+    #   artists : name -> line / scatter collection
+    #   layout  : get_layout of last chart, None if blank chart
+    hlines: list = None
+    artists: dict = None
+    layout: tuple = None
+
+    # Regular Expression
+    pattern1: str = re.compile(r'.*_(Max|Min)')  # check whether parameter name includes Max/Min
+    pattern2: str = re.compile(r'.*_(Std)')  # check whether parameter name includes Std
+    pattern3: str = re.compile(r'.*\.(.*)')  # ___ extract right side from floating point in mumber
+
+    def __init__(self, sheets: ExcelSPC, row: int, style: TrendStyle = None):
+        self.sheets: ExcelSPC = sheets
+        self.row: int = row
+        if style is None:
+            self.style: TrendStyle = TrendStyle()
+        else:
+            self.style: TrendStyle = style
+
+    # -------------------------------------------------------------------------
+    #  get - obtain SPC chart
+    #
+    #  argument
+    #    info : dictionary including parameter specific information
+    #
+    #  return
+    #    Figure instance with SPC chart, drawn with Agg canvas
+    # -------------------------------------------------------------------------
+    def get(self, info: dict):
+        return self.render(self.prepare(info))
+
+    # -------------------------------------------------------------------------
+    #  update - obtain SPC chart of another row on the same figure
+    #
+    #  argument
+    #    info : dictionary including parameter specific information
+    #    row  : row of 'Master' tab, None for current row
+    #
+    #  return
+    #    Figure instance of last get / update, updated in place
+    # -------------------------------------------------------------------------
+    def update(self, info: dict, row: int = None):
+        if row is not None:
+            self.row = row
+        return self.redraw(self.prepare(info))
+
+    # -------------------------------------------------------------------------
+    #  prepare - prepare data to draw SPC chart
+    #
+    #  argument
+    #    info : dictionary including parameter specific information
+    #
+    #  return
+    #    TrendData instance, error is set to TrendData.error
+    # -------------------------------------------------------------------------
+    def prepare(self, info: dict) -> TrendData:
+        name_part: str = info['PART']
+        name_param: str = info['PARAM']
+
+        data: TrendData = TrendData(name_part, name_param)
+        self.data = data
+
+        data.flag_SL = self.sheets.get_SL_flag(self.row)
+
+        # check whether parameter name includes Max/Min
+        match: bool = self.pattern1.match(name_param)
+        if match:
+            data.flag_no_CL = True
+        else:
+            data.flag_no_CL = False
+
+        try:
+            metrics: dict = self.sheets.get_metrics(name_part, name_param)
+        except KeyError:
+            data.error = 'Oops!  There is no metrics associate with the PART, \'' \
+                         + str(name_part) + '\' and the parameter name, \'' \
+                         + str(name_param) + '\'.  Please check the Excel macro/sheet.'
+            return data
+
+        if metrics['Spec Type'] != 'Two-Sided' and metrics['Spec Type'] != 'One-Sided':
+            # treat name_param includes '_Std' as 'One-Sided'
+            match: bool = self.pattern2.match(name_param)
+            if match:
+                metrics['Spec Type'] = 'One-Sided'
+        data.metrics = metrics
+
+        df: pd.DataFrame = self.sheets.get_series(name_part, name_param)
+        data.df = df
+
+        x: pd.Series = df['Sample']
+        if len(x.index) != len(x.unique()):
+            # copy() is for preventing from following warning:
+            # ------------------------------------------------
+            # SettingWithCopyWarning:
+            # A value is trying to be set on a copy of a slice from a DataFrame
+            x_copy: pd.Series = x.copy()
+            for i in x.index:
+                x_copy.loc[i] = i
+            x: pd.Series = x_copy
+
+        try:
+            y: pd.Series = df[name_param]
+        except KeyError:
+            data.error = 'Oops!  There is no value associate with the parameter name, \'' \
+                         + name_param + '\'.  Please check the Excel macro/sheet.'
+            return data
+
+        date: pd.Series = df['Date']
+
+        if len(date) == 0:
+            data.date_last = 'n/a'
+        else:
+            data.date_last: datetime = list(date)[len(date) - 1]
+
+        # =====================================================================
+        #  CAUTION! THIS IS TENTATIVE SOLUTION FOR NAN VALUES,
+        #  JUST SET ZERO FOR NAN VALUE
+        # =====================================================================
+        if y.isnull().any():
+            y2 = y.copy()
+            for i in range(y2.size):
+                if pd.isna(y2.iloc[i]):
+                    y2.iloc[i] = 0
+            y = y2
+
+        data.x = x
+        data.y = y
+        data.classes = classify(df, metrics, name_param, data.flag_no_CL)
+
+        return data
+
+    # -------------------------------------------------------------------------
+    #  render - draw SPC chart
+    #
+    #  argument
+    #    data : TrendData instance prepared by prepare
+    #    fig  : figure to be cleared and drawn, None for new figure
+    #
+    #  return
+    #    Figure instance with SPC chart, blank plot frame if data has error
+    # -------------------------------------------------------------------------
+    def render(self, data: TrendData, fig=None):
+        self.data = data
+        if fig is None:
+            fig = self.create_figure()
+        else:
+            fig.clear()
+            fig.subplots_adjust(left=self.style.margin_plot_left, right=self.style.margin_plot_right)
+        self.fig = fig
+        self.layout = None
+
+        if data.error is not None:
+            # return blank figure
+            ax = fig.add_subplot(111, title=data.param)
+            self.set_font(ax)
+            return fig
+
+        metrics: dict = data.metrics
+        name_param: str = data.param
+        x: pd.Series = data.x
+        y: pd.Series = data.y
+
+        # -----------------------------------------------------------------
+        # add first y axis
+        self.ax1 = fig.add_subplot(111, title=name_param)
+        self.ax1.grid(False)
+
+        # -----------------------------------------------------------------
+        # add second y axis wish same range as first y axis
+        self.ax2 = self.ax1.twinx()
+
+        # Spec / Control Limit(s), Target and Avg
+        self.hlines = []
+        for axis, label, linewidth, color in self.get_hlines(data):
+            ax = self.ax1 if axis == 1 else self.ax2
+            self.hlines.append(ax.axhline(y=metrics[label], linewidth=linewidth, color=color, label=label))
+
+        # _/_/_/_/_/_/_/
+        # Line
+        self.artists = {}
+        self.artists['line1'], = self.ax1.plot(x, y, linewidth=1, color='gray')
+        self.artists['line2'], = self.ax2.plot(x, y, linewidth=0, color='red')  # for debug
+
+        # Axis color
+        self.ax1.xaxis.label.set_color('gray')
+        self.ax1.yaxis.label.set_color(self.style.color_tick)
+        self.ax2.yaxis.label.set_color(self.style.color_tick)
+
+        # default tick color
+        self.ax1.tick_params(axis='x', colors='gray')
+        self.ax1.tick_params(axis='y', colors='gray')
+        self.ax2.tick_params(axis='y', colors='gray')
+
+        # Out Of Limits
+        self.draw_violations(data.classes, x, y)
+
+        # DATA POINTS
+
+        # _/_/_/_/_/_/_/
+        # Histric data
+        self.artists['Historic'] = self.draw_points('gray', 'Historic', data.classes & CLASS_HISTORIC > 0, x, y)
+
+        # _/_/_/_/_/_/_/
+        # Recent data
+        self.artists['Recent'] = self.draw_points('black', 'Recent', data.classes & CLASS_RECENT > 0, x, y)
+
+        # reflect ax1 limits to ax2 limits
+        self.ax2.set_ylim(self.ax1.get_ylim())
+
+        # ---------------------------------------------------------------------
+        # Label for HORIZONTAL LINE
+        # ---------------------------------------------------------------------
+        self.add_y_axis_labels(fig, metrics)
+
+        self.set_font(self.ax1)
+        self.set_font(self.ax2)
+
+        self.layout = self.get_layout(data)
+
+        return fig
+
+    # -------------------------------------------------------------------------
+    #  redraw - draw SPC chart on figure of last render
+    #  artists are updated in place if the chart has the same layout as the
+    #  last one, i.e. same lines and circles, otherwise figure is redrawn
+    #
+    #  argument
+    #    data : TrendData instance prepared by prepare
+    #
+    #  return
+    #    Figure instance with SPC chart
+    # -------------------------------------------------------------------------
+    def redraw(self, data: TrendData):
+        if self.fig is None:
+            return self.render(data)
+        if data.error is not None or self.layout is None or self.layout != self.get_layout(data):
+            return self.render(data, self.fig)
+
+        self.data = data
+        fig = self.fig
+        metrics: dict = data.metrics
+        x: pd.Series = data.x
+        y: pd.Series = data.y
+
+        self.ax1.title.set_text(data.param)
+
+        # move horizontal lines
+        for line, (axis, label, linewidth, color) in zip(self.hlines, self.get_hlines(data)):
+            line.set_ydata([metrics[label], metrics[label]])
+
+        # new line data & points
+        self.artists['line1'].set_data(x, y)
+        self.artists['line2'].set_data(x, y)
+        self.update_violations(data.classes, x, y)
+        self.update_points('Historic', data.classes & CLASS_HISTORIC > 0, x, y)
+        self.update_points('Recent', data.classes & CLASS_RECENT > 0, x, y)
+
+        # limits from new data, also reset after zoom / pan by toolbar
+        for ax in (self.ax1, self.ax2):
+            ax.set_autoscale_on(True)
+            ax.relim(visible_only=True)
+        self.ax1.autoscale_view()
+
+        # default ticks and labels, extra ticks are added again
+        for ax in (self.ax1, self.ax2):
+            ax.set_yscale('linear')
+            ax.yaxis.reset_ticks()
+            # tick labels are created again
+            self.set_font(ax)
+
+        self.ax2.set_ylim(self.ax1.get_ylim())
+        self.add_y_axis_labels(fig, metrics)
+
+        return fig
+
+    # -------------------------------------------------------------------------
+    #  create_figure - create empty figure without pyplot
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    Figure instance attached to Agg canvas
+    # -------------------------------------------------------------------------
+    def create_figure(self):
+        fig = Figure(dpi=self.style.dpi, figsize=self.style.figsize)
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(left=self.style.margin_plot_left, right=self.style.margin_plot_right)
+
+        return fig
+
+    # -------------------------------------------------------------------------
+    #  set_font - apply font family of style to texts of axes
+    #
+    #  argument
+    #    ax : axes
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def set_font(self, ax):
+        ax.title.set_fontfamily(self.style.font_family)
+        try:
+            # matplotlib 3.8 or later, also applied to ticks created later
+            ax.tick_params(labelfontfamily=self.style.font_family)
+        except ValueError:
+            for label in ax.get_xticklabels() + ax.get_yticklabels():
+                label.set_fontfamily(self.style.font_family)
+
+    # -------------------------------------------------------------------------
+    #  get_data
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    TrendData instance of last chart
+    # -------------------------------------------------------------------------
+    def get_data(self) -> TrendData:
+        return self.data
+
+    # -------------------------------------------------------------------------
+    #  get_error
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    error message if chart could not be drawn, otherwise None
+    # -------------------------------------------------------------------------
+    def get_error(self):
+        if self.data is None:
+            return None
+        return self.data.error
+
+    # -------------------------------------------------------------------------
+    #  get_last_date
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    latest data information of the data
+    # -------------------------------------------------------------------------
+    def get_last_date(self):
+        if self.data is None:
+            return None
+        return self.data.date_last
+
+    # -------------------------------------------------------------------------
+    #  get_classes
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    CLASS_* flags of data points of last chart, None if not prepared
+    # -------------------------------------------------------------------------
+    def get_classes(self):
+        if self.data is None:
+            return None
+        return self.data.classes
+
+    # -------------------------------------------------------------------------
+    #  draw_points
+    #
+    #  argument
+    #    color : color of points
+    #    type  : 'Historic' or 'Recent', label of points
+    #    mask  : bool array of points to draw
+    #    x     :
+    #    y     :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def draw_points(self, color: str, type: str, mask, x, y):
+        return self.ax1.scatter(x[mask], y[mask], s=self.style.size_point, c=color, marker='o', label=type)
+
+    # -------------------------------------------------------------------------
+    #  update_points
+    #  move points drawn by draw_points
+    #
+    #  argument
+    #    type  : 'Historic' or 'Recent', label of points
+    #    mask  : bool array of points to draw
+    #    x     :
+    #    y     :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def update_points(self, type: str, mask, x, y):
+        self.artists[type].set_offsets(np.column_stack([x[mask], y[mask]]))
+
+    # -------------------------------------------------------------------------
+    #  get_hlines
+    #  horizontal lines of chart in order of drawing
+    #
+    #  argument
+    #    data : TrendData instance
+    #
+    #  return
+    #    list of (axis 1 or 2, label of metrics, linewidth, color)
+    # -------------------------------------------------------------------------
+    def get_hlines(self, data: TrendData) -> list:
+        hlines = []
+        if data.metrics['Spec Type'] == 'Two-Sided':
+            self.hlines_two_sided(hlines, data)
+        elif data.metrics['Spec Type'] == 'One-Sided':
+            self.hlines_one_sided(hlines, data)
+
+        # Avg
+        if not np.isnan(data.metrics['Avg']):
+            hlines.append((1, 'Avg', 1, self.style.AVG))
+
+        return hlines
+
+    # -------------------------------------------------------------------------
+    #  get_layout
+    #  artists of chart, charts of same layout are updated in place
+    #
+    #  argument
+    #    data : TrendData instance
+    #
+    #  return
+    #    tuple to be compared
+    # -------------------------------------------------------------------------
+    def get_layout(self, data: TrendData) -> tuple:
+        return data.flag_no_CL, tuple((axis, label) for axis, label, linewidth, color in self.get_hlines(data))
+
+    # -------------------------------------------------------------------------
+    #  hlines_one_sided
+    #
+    #  argument
+    #    hlines : list of horizontal lines to be appended
+    #    data   : TrendData instance
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def hlines_one_sided(self, hlines: list, data: TrendData):
+        metrics = data.metrics
+        if data.flag_SL is False:
+            if not np.isnan(metrics['USL']):
+                hlines.append((1, 'USL', 1, self.style.SL))
+                hlines.append((2, 'USL', 0, self.style.SL))
+        if data.flag_no_CL is False:
+            if not np.isnan(metrics['UCL']):
+                hlines.append((1, 'UCL', 1, self.style.CL))
+            if not np.isnan(metrics['RUCL']):
+                hlines.append((1, 'RUCL', 1, self.style.RCL))
+
+    # -------------------------------------------------------------------------
+    #  hlines_two_sided
+    #
+    #  argument
+    #    hlines : list of horizontal lines to be appended
+    #    data   : TrendData instance
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def hlines_two_sided(self, hlines: list, data: TrendData):
+        metrics = data.metrics
+        self.hlines_one_sided(hlines, data)
+
+        if not np.isnan(metrics['Target']):
+            hlines.append((1, 'Target', 1, self.style.TG))
+
+        if data.flag_no_CL is False:
+            if not np.isnan(metrics['RLCL']):
+                hlines.append((1, 'RLCL', 1, self.style.RCL))
+            if not np.isnan(metrics['LCL']):
+                hlines.append((1, 'LCL', 1, self.style.CL))
+
+        if data.flag_SL is False:
+            if not np.isnan(metrics['LSL']):
+                hlines.append((1, 'LSL', 1, self.style.SL))
+                hlines.append((2, 'LSL', 0, self.style.SL))
+
+    # -------------------------------------------------------------------------
+    #  draw_violations
+    #  circles on OOC / OOS points
+    #
+    #  argument
+    #    classes : CLASS_* flags of data points
+    #    x       :
+    #    y       :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def draw_violations(self, classes, x, y):
+        # OOC check
+        if self.data.flag_no_CL is False:
+            ooc = classes & CLASS_OOC > 0
+            self.artists['OOC'] = self.draw_circle(self.ax1, x[ooc], y[ooc], self.style.size_ooc_out, self.style.size_ooc_in, self.style.color_ooc_out, self.style.color_ooc_in)
+
+        # OOS check
+        oos = classes & CLASS_OOS > 0
+        self.artists['OOS'] = self.draw_circle(self.ax1, x[oos], y[oos], self.style.size_oos_out, self.style.size_oos_in, self.style.color_oos_out, self.style.color_oos_in)
+
+    # -------------------------------------------------------------------------
+    #  update_violations
+    #  move circles drawn by draw_violations
+    #
+    #  argument
+    #    classes : CLASS_* flags of data points
+    #    x       :
+    #    y       :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def update_violations(self, classes, x, y):
+        for name, flag in (('OOC', CLASS_OOC), ('OOS', CLASS_OOS)):
+            if name not in self.artists:
+                continue
+            mask = classes & flag > 0
+            offsets = np.column_stack([x[mask], y[mask]])
+            for collection in self.artists[name]:
+                collection.set_offsets(offsets)
+
+    # -------------------------------------------------------------------------
+    #  add_y_axis_labels
+    #
+    #  argument
+    #    ax        :
+    #    x         :
+    #    y         :
+    #    size_out  :
+    #    size_in   :
+    #    color_out :
+    #    color_in  :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def draw_circle(self, ax, x, y, size_out, size_in, color_out, color_in):
+        return (ax.scatter(x, y, s=size_out, c=color_out, marker='o'),
+                ax.scatter(x, y, s=size_in, c=color_in, marker='o'))
+
+    # -------------------------------------------------------------------------
+    #  add_y_axis_labels
+    #
+    #  argument
+    #    fig     :
+    #    metrics :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def add_y_axis_labels(self, fig, metrics):
+        list_labels_left = []
+        list_labels_right = []
+        if metrics['Spec Type'] == 'Two-Sided':
+            # LEFT
+            if self.data.flag_no_CL is False:
+                labels_left = ['LCL', 'Target', 'UCL']
+            else:
+                labels_left = ['Target']
+
+            if self.data.flag_SL is False:
+                labels_left.extend(['LSL', 'USL'])
+
+            # RIGHT
+            if self.data.flag_no_CL is False:
+                labels_right = ['RLCL', 'Avg', 'RUCL']
+            else:
+                labels_right = ['Avg']
+        elif metrics['Spec Type'] == 'One-Sided':
+            # LEFT
+            if self.data.flag_no_CL is False:
+                labels_left = ['UCL']
+            else:
+                labels_left = []
+
+            if self.data.flag_SL is False:
+                labels_left.extend(['USL'])
+
+            # RIGHT
+            if self.data.flag_no_CL is False:
+                labels_right = ['Avg', 'RUCL']
+            else:
+                labels_right = ['Avg']
+        else:
+            labels_left = []
+            labels_right = ['Avg']
+
+        # Check whether defined label has number or not
+        for label in labels_left:
+            if not np.isnan(metrics[label]):
+                list_labels_left.append(label)
+        for label in labels_right:
+            if not np.isnan(metrics[label]):
+                list_labels_right.append(label)
+
+        self.add_y_axis_labels_at_left(fig, list_labels_left, metrics)
+        self.add_y_axis_labels_at_right(fig, list_labels_right, metrics)
+
+    # -------------------------------------------------------------------------
+    #  add_y_axis_labels_at_left
+    #
+    #  argument
+    #    fig         :
+    #    list_labels :
+    #    metrics     :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def add_y_axis_labels_at_left(self, fig, list_labels, metrics):
+        if len(list_labels) > 0:
+            # Left Axis: add extra ticks
+            self.add_extra_tick_values(self.ax1, list_labels, metrics)
+
+            # Left Axis: extra labels
+            labels: list = self.get_tick_labels(self.ax1)
+            nformat: str = self.get_tick_label_format(labels)
+            n: int = len(labels)
+            m: int = len(list_labels)
+            for i in range(m):
+                k: int = n - m + i
+                label_new: str = list_labels[i]
+                value: float = metrics[label_new]
+                labels[k] = label_new + ' = ' + nformat.format(value)
+            self.ax1.set_yticklabels(labels)
+
+            # Left Axis: color
+            yticklabels: list = self.ax1.get_yticklabels()
+            n: int = len(yticklabels)
+            m: int = len(list_labels)
+            for i in range(m):
+                k: int = n - m + i
+                label: str = list_labels[i]
+                if label == 'USL' or label == 'LSL':
+                    color: str = self.style.SL
+                elif label == 'UCL' or label == 'LCL':
+                    color: str = self.style.CL
+                elif label == 'Target':
+                    color: str = self.style.TG
+                else:
+                    color: str = 'black'
+
+                yticklabels[k].set_color(color)
+
+    # -------------------------------------------------------------------------
+    #  add_y_axis_labels_at_right
+    #
+    #  argument
+    #    fig         :
+    #    list_labels :
+    #    metrics     :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def add_y_axis_labels_at_right(self, fig, list_labels, metrics):
+        if len(list_labels) > 0:
+            # Right Axis: add extra ticks
+            self.add_extra_tick_values(self.ax2, list_labels, metrics)
+
+            # Right Axis: labels
+            labels: list = self.get_tick_labels(self.ax2)
+            nformat: str = self.get_tick_label_format(labels)
+            n: int = len(labels)
+            m: int = len(list_labels)
+            for i in range(m):
+                k: int = n - m + i
+                label_new: str = list_labels[i]
+                value: float = metrics[label_new]
+                labels[k] = nformat.format(value) + ' = ' + label_new
+            self.ax2.set_yticklabels(labels)
+
+            # Right Axis: color
+            yticklabels: list = self.ax2.get_yticklabels()
+            n: int = len(yticklabels)
+            m: int = len(list_labels)
+            for i in range(m):
+                k: int = n - m + i
+                label: str = list_labels[i]
+                if label == 'RUCL' or label == 'RLCL':
+                    color: str = self.style.RCL
+                elif label == 'Avg':
+                    color: str = self.style.AVG
+                else:
+                    color: str = 'black'
+
+                yticklabels[k].set_color(color)
+
+    # -------------------------------------------------------------------------
+    #  add_extra_tick_values
+    #
+    #  argument
+    #    ax          :
+    #    list_labels :
+    #    metrics     :
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def add_extra_tick_values(self, ax, list_labels, metrics):
+        extraticks: list = []
+        for label in list_labels:
+            extraticks.append(metrics[label])
+
+        ax.set_yticks(list(ax.get_yticks()) + extraticks)
+
+    # -------------------------------------------------------------------------
+    #  get_tick_labels
+    #  labels of y ticks as drawn, formatted by the formatter of the axis
+    #  without drawing the figure
+    #
+    #  argument
+    #    ax :
+    #
+    #  return
+    #    list of label strings in order of ticks
+    # -------------------------------------------------------------------------
+    def get_tick_labels(self, ax) -> list:
+        axis = ax.yaxis
+        return list(axis.get_major_formatter().format_ticks(axis.get_majorticklocs()))
+
+    # -------------------------------------------------------------------------
+    #  get_tick_label_format
+    #
+    #  argument
+    #    labels :
+    #
+    #  return
+    #    nformat - formatted string
+    # -------------------------------------------------------------------------
+    def get_tick_label_format(self, labels: list) -> str:
+        digit: int = 0
+        for label in labels:
+            match: bool = self.pattern3.match(label)
+            if match:
+                n: int = len(match.group(1))
+                if n > digit:
+                    digit: int = n
+        nformat: str = '{:.' + str(digit) + 'f}'
+
+        return nformat
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# TrendCache
+#
+# description
+#   LRU cache of TrendData keyed by (row, Spec Limit flag),
+#   rows expected to be shown next are prepared by background worker
+class TrendCache():
+    # number of TrendData to be kept
+    maxsize: int = 16
+
+    def __init__(self, sheets: ExcelSPC, maxsize: int = None):
+        self.sheets = sheets
+        if maxsize is not None:
+            self.maxsize = maxsize
+
+        self.items: OrderedDict = OrderedDict()
+        # key -> Future of TrendData being prepared by worker
+        self.pending: dict = {}
+        # incremented by clear, TrendData of older generation is discarded
+        self.generation: int = 0
+        self.lock = threading.Lock()
+        self.executor: ThreadPoolExecutor = None
+
+    # -------------------------------------------------------------------------
+    #  get_key
+    #
+    #  argument
+    #    row : row of 'Master' tab
+    #
+    #  return
+    #    key of cache
+    # -------------------------------------------------------------------------
+    def get_key(self, row: int) -> tuple:
+        return row, self.sheets.get_SL_flag(row)
+
+    # -------------------------------------------------------------------------
+    #  prepare
+    #  prepare TrendData of row with own Trend instance
+    #
+    #  argument
+    #    row : row of 'Master' tab
+    #
+    #  return
+    #    TrendData instance
+    # -------------------------------------------------------------------------
+    def prepare(self, row: int) -> TrendData:
+        name_part, name_param = self.sheets.get_part_param(row)
+        info = {
+            'PART': name_part,
+            'PARAM': name_param,
+        }
+        return Trend(self.sheets, row).prepare(info)
+
+    # -------------------------------------------------------------------------
+    #  put
+    #  store TrendData, least recently used one is dropped if cache is full
+    #
+    #  argument
+    #    key  : key of cache, see get_key
+    #    data : TrendData instance
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def put(self, key: tuple, data: TrendData):
+        with self.lock:
+            self.put_locked(key, data)
+
+    # -------------------------------------------------------------------------
+    #  put_locked
+    #  same as put, called with lock held
+    #
+    #  argument
+    #    key  : key of cache, see get_key
+    #    data : TrendData instance
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def put_locked(self, key: tuple, data: TrendData):
+        self.items[key] = data
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    # -------------------------------------------------------------------------
+    #  get
+    #  TrendData of row, prepared in current thread if not cached
+    #
+    #  argument
+    #    row : row of 'Master' tab
+    #
+    #  return
+    #    TrendData instance
+    # -------------------------------------------------------------------------
+    def get(self, row: int) -> TrendData:
+        key = self.get_key(row)
+        with self.lock:
+            data: TrendData = self.items.get(key)
+            if data is not None:
+                self.items.move_to_end(key)
+                return data
+            future: Future = self.pending.get(key)
+
+        if future is not None:
+            # being prepared by worker, prepared again below if prefetch failed
+            try:
+                return future.result()
+            except Exception:
+                pass
+
+        data = self.prepare(row)
+        self.put(key, data)
+        return data
+
+    # -------------------------------------------------------------------------
+    #  prefetch
+    #  prepare TrendData of rows by background worker,
+    #  prefetch of other rows not started yet is cancelled
+    #
+    #  argument
+    #    rows : rows of 'Master' tab in order of priority
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def prefetch(self, rows):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1)
+            list_key = [(self.get_key(row), row) for row in rows]
+
+            # rows requested before are not adjacent any more
+            keys = {key for key, row in list_key}
+            for key in [key for key in self.pending if key not in keys]:
+                if self.pending[key].cancel():
+                    del self.pending[key]
+
+            for key, row in list_key:
+                if key in self.items or key in self.pending:
+                    continue
+                self.pending[key] = self.executor.submit(self.run_prefetch, key, row, self.generation)
+
+    # -------------------------------------------------------------------------
+    #  run_prefetch
+    #  prepare TrendData in background worker and store it, result is
+    #  discarded if cache has been cleared in the meantime
+    #
+    #  argument
+    #    key        : key of cache, see get_key
+    #    row        : row of 'Master' tab
+    #    generation : generation of cache when submitted
+    #
+    #  return
+    #    TrendData instance
+    # -------------------------------------------------------------------------
+    def run_prefetch(self, key: tuple, row: int, generation: int) -> TrendData:
+        data = None
+        try:
+            data = self.prepare(row)
+            return data
+        finally:
+            with self.lock:
+                if generation == self.generation:
+                    self.pending.pop(key, None)
+                    if data is not None:
+                        self.put_locked(key, data)
+
+    # -------------------------------------------------------------------------
+    #  clear
+    #  forget all TrendData, e.g. data source is switched
+    #
+    #  argument
+    #    sheets : new data source, None to keep current one
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def clear(self, sheets=None):
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending = {}
+            self.items.clear()
+            self.generation += 1
+            if sheets is not None:
+                self.sheets = sheets
+
+    # -------------------------------------------------------------------------
+    #  shutdown
+    #  stop background worker, pending prefetches are cancelled by clear
+    # -------------------------------------------------------------------------
+    def shutdown(self):
+        self.clear()
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+# ---
+# PROGRAM END
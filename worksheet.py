@@ -1,10 +1,12 @@
 import pandas as pd
 import numpy as np
+from master_filter import MasterIndex
 from office import ExcelSPC
 from typing import Any
 
 from PySide2.QtCore import (
     Qt,
+    QAbstractProxyModel,
     QAbstractTableModel,
     QModelIndex,
 )
@@ -14,6 +16,29 @@ from PySide2.QtWidgets import (
 )
 
 
+# -----------------------------------------------------------------------------
+#  format_column
+#  format values of column as Qt displays them
+#
+#  argument
+#    values : numpy array of column
+#
+#  return
+#    numpy object array of str
+# -----------------------------------------------------------------------------
+def format_column(values: np.ndarray) -> np.ndarray:
+    text = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        if isinstance(value, (float, np.floating)):
+            # same as QLocale.toString(double), 'g' format with precision 6
+            text[i] = '%.6g' % value
+        elif value is None:
+            text[i] = ''
+        else:
+            text[i] = str(value)
+    return text
+
+
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class SPCTableModel(QAbstractTableModel):
     def __init__(self, df: pd.DataFrame, col_headers: list):
@@ -21,11 +46,27 @@ class SPCTableModel(QAbstractTableModel):
         self.df: pd.DataFrame = df
         self.col_headers: list = col_headers
 
+        # column arrays built once, data() only indexes them
+        #   values : python scalars for EditRole
+        #   texts  : formatted str for DisplayRole
+        self.values: list = [np.array(df.iloc[:, col].tolist(), dtype=object) for col in range(len(df.columns))]
+        self.texts: list = [format_column(values) for values in self.values]
+        # numeric column is aligned to right
+        self.alignments: list = []
+        for values in self.values:
+            if all(isinstance(value, (int, float)) for value in values):
+                self.alignments.append(int(Qt.AlignRight | Qt.AlignVCenter))
+            else:
+                self.alignments.append(int(Qt.AlignLeft | Qt.AlignVCenter))
+
+        self.n_rows: int = len(df)
+        self.n_cols: int = len(df.columns)
+
     def rowCount(self, parent=QModelIndex()) -> int:
-        return len(self.df)
+        return self.n_rows
 
     def columnCount(self, parent=QModelIndex()) -> int:
-        return len(self.df.columns)
+        return self.n_cols
 
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
         if role != Qt.DisplayRole:
@@ -37,29 +78,234 @@ class SPCTableModel(QAbstractTableModel):
 
     def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
         if role == Qt.DisplayRole:
-            value = self.df.iat[index.row(), index.column()]
-            if type(value) is np.int64:
-                value = value.tolist()
-            elif type(value) is np.float64:
-                value = value.tolist()
-            return value
+            return self.texts[index.column()][index.row()]
+        elif role == Qt.EditRole:
+            return self.values[index.column()][index.row()]
+        elif role == Qt.TextAlignmentRole:
+            return self.alignments[index.column()]
+        return None
+
+    # -------------------------------------------------------------------------
+    #  get_column_samples
+    #  longest texts of column to measure column width
+    #
+    #  argument
+    #    col : column number
+    #    n   : number of samples
+    #
+    #  return
+    #    list of str
+    # -------------------------------------------------------------------------
+    def get_column_samples(self, col: int, n: int = 5) -> list:
+        texts = self.texts[col]
+        if len(texts) <= n:
+            return list(texts)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        return [texts[i] for i in np.argpartition(lengths, -n)[-n:]]
+
+
+# _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
+# MasterProxyModel
+#
+# description
+#   filtered and sorted view of SPCTableModel, view row -> source row is
+#   numpy array computed by MasterIndex, row header shows source row number
+class MasterProxyModel(QAbstractProxyModel):
+    def __init__(self, source: SPCTableModel, index: MasterIndex):
+        QAbstractProxyModel.__init__(self)
+        self.setSourceModel(source)
+        self.master_index: MasterIndex = index
+
+        self.mask: np.ndarray = np.ones(index.num_rows, dtype=bool)
+        self.sort_column: int = -1
+        self.descending: bool = False
+
+        # view row -> source row, source row -> view row (-1 if hidden)
+        self.rows: np.ndarray = np.arange(index.num_rows)
+        self.view_rows: np.ndarray = np.arange(index.num_rows)
+
+    # -------------------------------------------------------------------------
+    #  set_query
+    #  filter rows with query of MasterIndex
+    #
+    #  argument
+    #    text : query string, QueryError if invalid
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def set_query(self, text: str):
+        self.mask = self.master_index.query(text)
+        self.update_rows()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.update_rows()
+
+    def update_rows(self):
+        name = None
+        if 0 <= self.sort_column < len(self.master_index.columns):
+            name = self.master_index.columns[self.sort_column]
+
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        old_rows = [self.rows[index.row()] for index in old]
+
+        self.rows = self.master_index.sort_rows(np.flatnonzero(self.mask), name, self.descending)
+        self.view_rows = np.full(self.master_index.num_rows, -1)
+        self.view_rows[self.rows] = np.arange(len(self.rows))
+
+        new = []
+        for index, row in zip(old, old_rows):
+            row_view = self.view_rows[row]
+            new.append(self.createIndex(int(row_view), index.column()) if row_view >= 0 else QModelIndex())
+        self.changePersistentIndexList(old, new)
+        self.layoutChanged.emit()
+
+    def get_source_row(self, row: int) -> int:
+        return int(self.rows[row])
+
+    def get_view_row(self, row: int) -> int:
+        return int(self.view_rows[row])
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self.sourceModel().columnCount()
+
+    def index(self, row: int, column: int, parent=QModelIndex()) -> QModelIndex:
+        if parent.isValid() or not (0 <= row < len(self.rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()) -> QModelIndex:
+        return QModelIndex()
+
+    def mapToSource(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self.rows[index.row()]), index.column())
+
+    def mapFromSource(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        row = self.view_rows[index.row()]
+        if row < 0:
+            return QModelIndex()
+        return self.createIndex(int(row), index.column())
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if orientation == Qt.Vertical and role == Qt.DisplayRole:
+            # row number of 'Master' tab
+            return "{}".format(self.rows[section] + 1)
+        return self.sourceModel().headerData(section, orientation, role)
 
 
 # _/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_/_
 class SheetMaster(QTableView):
+    # maximum width of column in pixel
+    max_column_width: int = 400
+
     def __init__(self, sheets: ExcelSPC):
         super().__init__()
 
         # no word wrap
         self.setWordWrap(False)
-        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
 
         # master data frame
         self.df: pd.DataFrame = sheets.get_master()
 
-        # set table model
-        self.setModel(SPCTableModel(self.df, sheets.get_header_master()))
+        # set table model, sorted and filtered through proxy
+        self.model_source: SPCTableModel = SPCTableModel(self.df, sheets.get_header_master())
+        self.proxy: MasterProxyModel = MasterProxyModel(self.model_source, MasterIndex(self.df))
+        self.setModel(self.proxy)
+
+        # order of 'Master' tab until column header is clicked
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setSortingEnabled(True)
+
+        # sizes are computed once instead of ResizeToContents,
+        # which queries every cell of the table
+        self.resize_sections()
+
+    # -------------------------------------------------------------------------
+    #  resize_sections
+    #  column widths from header and sampled texts, fixed row height
+    #
+    #  argument
+    #    (none)
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def resize_sections(self):
+        model: SPCTableModel = self.model_source
+        fm = self.fontMetrics()
+        fm_header = self.horizontalHeader().fontMetrics()
+        padding: int = 2 * fm.horizontalAdvance(' ') + 2 * self.style().pixelMetric(self.style().PM_FocusFrameHMargin) + 4
+
+        header: QHeaderView = self.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        for col in range(model.columnCount()):
+            width = fm_header.horizontalAdvance(str(model.headerData(col, Qt.Horizontal))) + padding
+            for text in model.get_column_samples(col):
+                width = max(width, fm.horizontalAdvance(text) + padding)
+            header.resizeSection(col, min(width, self.max_column_width))
+
+        vheader: QHeaderView = self.verticalHeader()
+        vheader.setSectionResizeMode(QHeaderView.Fixed)
+        vheader.setDefaultSectionSize(fm.height() + 6)
 
     def get_num_param(self):
-        return len(self.df)
\ No newline at end of file
+        return len(self.df)
+
+    # -------------------------------------------------------------------------
+    #  set_query
+    #  show rows matching query only
+    #
+    #  argument
+    #    text : query string, see master_filter.py
+    #
+    #  return
+    #    number of rows shown, QueryError if query is invalid
+    # -------------------------------------------------------------------------
+    def set_query(self, text: str) -> int:
+        self.proxy.set_query(text)
+        return self.proxy.rowCount()
+
+    # -------------------------------------------------------------------------
+    #  get_source_row
+    #  row of 'Master' tab shown at row of view
+    #
+    #  argument
+    #    row : row of view
+    #
+    #  return
+    #    row of 'Master' tab
+    # -------------------------------------------------------------------------
+    def get_source_row(self, row: int) -> int:
+        return self.proxy.get_source_row(row)
+
+    # -------------------------------------------------------------------------
+    #  select_source_row
+    #  select row of view showing row of 'Master' tab
+    #
+    #  argument
+    #    row : row of 'Master' tab
+    #
+    #  return
+    #    (none)
+    # -------------------------------------------------------------------------
+    def select_source_row(self, row: int):
+        row_view = self.proxy.get_view_row(row)
+        if row_view < 0:
+            # filtered out
+            self.clearSelection()
+            return
+        self.selectRow(row_view)